@@ -1,10 +1,33 @@
 from interpreter.interpreter.interpreter import Interpreter
+from interpreter.lexical_analysis.lexer import SCANNERS
+from interpreter.syntax_analysis.parser import PARSERS
+from interpreter.syntax_analysis.profiler import ParserProfiler
+from interpreter.semantic_analysis.analyzer import SemanticAnalyzer
+from interpreter.frontend import read, front_end_batch
+from interpreter.cache import Cache
+from interpreter.utils.utils import MessageColor
 import argparse
+import json
+import time
 
 
 parser = argparse.ArgumentParser(description='Execute .c file')
-parser.add_argument('-f', '--file', help='File with C code')
+parser.add_argument('-f', '--file', nargs='+', help='File with C code')
 parser.add_argument('-c', '--code', help='Code of C code')
+parser.add_argument('-s', '--scanner', choices=sorted(SCANNERS), default='regex',
+                    help='Lexer used to tokenize the code')
+parser.add_argument('-p', '--parser', choices=sorted(PARSERS), default='recursive',
+                    help='Parser used, stack parses any depth of nesting')
+parser.add_argument('-j', '--jobs', type=int,
+                    help='Only lex, parse and analyze the files, in N processes')
+parser.add_argument('--strict', action='store_true',
+                    help='Parse and analyze every function before running, not on its first call')
+parser.add_argument('--no-cache', action='store_true',
+                    help='Neither read nor store the analyzed program in the cache')
+parser.add_argument('--profile', choices=['report', 'json'],
+                    help='Only parse the code, and print the time spent in each grammar rule')
+parser.add_argument('--scopes', action='store_true',
+                    help='Only analyze the code, and print its scopes with their symbols')
 
 args = parser.parse_args()
 if not args.file and not args.code:
@@ -13,10 +36,74 @@ if not args.file and not args.code:
 elif args.file and args.code:
     argparse.ArgumentParser().error('You can choose only one argument [-f or -c]')
 
-code = ''
-if args.file:
-    with open(args.file, 'r') as file:
-        code = file.read()
+elif args.code and args.jobs:
+    argparse.ArgumentParser().error('--jobs only applies to files [-f]')
+
+if args.profile:
+    profiler = ParserProfiler()
+    sources = [(path, read(path, args.scanner)) for path in args.file] if args.file else [
+        ('<code>', args.code.encode() if args.scanner == 'mmap' else args.code)
+    ]
+    for path, code in sources:
+        try:
+            profiler.instrument(PARSERS[args.parser](SCANNERS[args.scanner](code))).parse()
+        except Exception as message:
+            print("{}{} [{}] {}{}".format(
+                MessageColor.FAIL, path, type(message).__name__, message, MessageColor.ENDC
+            ))
+    if args.profile == 'json':
+        print(json.dumps(profiler.to_json(), indent=2))
+    else:
+        print(profiler.report())
+
+elif args.scopes:
+    sources = [(path, read(path, args.scanner)) for path in args.file] if args.file else [
+        ('<code>', args.code.encode() if args.scanner == 'mmap' else args.code)
+    ]
+    for path, code in sources:
+        try:
+            tree = PARSERS[args.parser](SCANNERS[args.scanner](code)).parse()
+            table = SemanticAnalyzer.analyze(tree, history=True).table
+            print(path)
+            print(table)
+        except Exception as message:
+            print("{}{} [{}] {}{}".format(
+                MessageColor.FAIL, path, type(message).__name__, message, MessageColor.ENDC
+            ))
+
+elif args.jobs or (args.file and len(args.file) > 1):
+    start = time.perf_counter()
+    results = front_end_batch(
+        args.file, jobs=args.jobs, scanner=args.scanner, parser=args.parser
+    )
+    elapsed = time.perf_counter() - start
+    for result in results:
+        if result.error is None:
+            print("{} lex {:.4f}s parse {:.4f}s analyze {:.4f}s".format(
+                result.path, result.lex_time, result.parse_time, result.analyze_time
+            ))
+        else:
+            print("{}{} [{}] {}{}".format(
+                MessageColor.FAIL,
+                result.path,
+                type(result.error).__name__,
+                result.error,
+                MessageColor.ENDC
+            ))
+        for warning in result.warnings:
+            print(warning)
+    failed = sum(result.error is not None for result in results)
+    print(MessageColor.OKBLUE + "{} files, {} failed, in {:.4f}s".format(
+        len(results), failed, elapsed
+    ) + MessageColor.ENDC)
+
 else:
-    code = args.code
-Interpreter.run(code)
+    if args.file:
+        code = read(args.file[0], args.scanner)
+    elif args.scanner == 'mmap':
+        code = args.code.encode()
+    else:
+        code = args.code
+    cache = None if args.no_cache else Cache()
+    Interpreter.run(code, scanner=args.scanner, parser=args.parser, cache=cache,
+                    strict=args.strict)
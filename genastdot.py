@@ -19,6 +19,7 @@ class ASTVisualizer(NodeVisitor):
     def __init__(self, parser):
         self.parser = parser
         self.ncount = 1
+        self.nums = {}  # node -> number of its DOT node
         self.dot_header = [textwrap.dedent("""\
         digraph astgraph {
           node [shape=circle, fontsize=12, fontname="Courier", height=.1];
@@ -32,71 +33,71 @@ class ASTVisualizer(NodeVisitor):
     def visit_Program(self, node, *args, **kwargs):
         s = '  node{} [label="Program"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         for child in node.children:
             self.visit(child)
-            s = '  node{} -> node{}\n'.format(node._num, child._num)
+            s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[child])
             self.dot_body.append(s)
 
     def visit_StructType(self, node, *args, **kwargs):
         s = '  node{} [label="StructType"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         s = '  node{} [label="{}"]\n'.format(self.ncount, node.struct_name)
         self.dot_body.append(s)
-        s = '  node{} -> node{}\n'.format(node._num, self.ncount)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.ncount)
         self.dot_body.append(s)
         self.ncount += 1
 
         for child in node.struct_body:
             self.visit(child)
-            s = '  node{} -> node{}\n'.format(node._num, child._num)
+            s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[child])
             self.dot_body.append(s)
 
     def visit_StructDecl(self, node, *args, **kwargs):
         s = '  node{} [label="StructDecl"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         s = '  node{} [label="{}"]\n'.format(self.ncount, node.struct_name)
         self.dot_body.append(s)
-        s = '  node{} -> node{}\n'.format(node._num, self.ncount)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.ncount)
         self.dot_body.append(s)
         self.ncount += 1
 
         s = '  node{} [label="{}"]\n'.format(self.ncount, node.struct_type)
         self.dot_body.append(s)
-        s = '  node{} -> node{}\n'.format(node._num, self.ncount)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.ncount)
         self.dot_body.append(s)
         self.ncount += 1
 
     def visit_StructVar(self, node, *args, **kwargs):
         s = '  node{} [label="{}"]\n'.format(self.ncount, node.struct_name)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
         self.visit(node.struct_variable)
-        s = '  node{} -> node{}\n'.format(node._num, node.struct_variable._num)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[node.struct_variable])
         self.dot_body.append(s)
 
 
     def visit_VarDecl(self, node, *args, **kwargs):
         s = '  node{} [label="VarDecl"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         self.visit(node.var_node)
-        s = '  node{} -> node{}\n'.format(node._num, node.var_node._num)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[node.var_node])
         self.dot_body.append(s)
 
         self.visit(node.type_node)
-        s = '  node{} -> node{}\n'.format(node._num, node.type_node._num)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[node.type_node])
         self.dot_body.append(s)
 
     def visit_FunctionDecl(self, node, *args, **kwargs):
@@ -105,108 +106,108 @@ class ASTVisualizer(NodeVisitor):
             node.func_name
         )
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         for param_node in node.params:
             self.visit(param_node)
-            s = '  node{} -> node{}\n'.format(node._num, param_node._num)
+            s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[param_node])
             self.dot_body.append(s)
 
         self.visit(node.body)
-        s = '  node{} -> node{}\n'.format(node._num, node.body._num)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[node.body])
         self.dot_body.append(s)
 
     def visit_CompoundStmt(self, node, *args, **kwargs):
         s = '  node{} [label="CompoundStmt"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         for child in node.children:
             self.visit(child)
-            s = '  node{} -> node{}\n'.format(node._num, child._num)
+            s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[child])
             self.dot_body.append(s)
 
     def visit_FunctionBody(self, node, *args, **kwargs):
         s = '  node{} [label="FunctionBody"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         for child in node.children:
             self.visit(child)
-            s = '  node{} -> node{}\n'.format(node._num, child._num)
+            s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[child])
             self.dot_body.append(s)
 
     def visit_Param(self, node, *args, **kwargs):
         s = '  node{} [label="Param"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         for child_node in (node.var_node, node.type_node):
             self.visit(child_node)
-            s = '  node{} -> node{}\n'.format(node._num, child_node._num)
+            s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[child_node])
             self.dot_body.append(s)
 
     def visit_Assign(self, node, *args, **kwargs):
         s = '  node{} [label="{}"]\n'.format(self.ncount, node.op.value)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         for child_node in (node.left, node.right):
             sys.stderr.write("%s\n" % child_node)
             self.visit(child_node)
-            s = '  node{} -> node{}\n'.format(node._num, child_node._num)
+            s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[child_node])
             self.dot_body.append(s)
 
     def visit_Type(self, node, *args, **kwargs):
         s = '  node{} [label="{}"]\n'.format(self.ncount, node.token.value)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
     def visit_Var(self, node, *args, **kwargs):
         s = '  node{} [label="{}"]\n'.format(self.ncount, node.value)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
     def visit_Num(self, node, *args, **kwargs):
         s = '  node{} [label="{}"]\n'.format(self.ncount, node.token.value)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
     def visit_BinOp(self, node, *args, **kwargs):
         s = '  node{} [label="{}"]\n'.format(self.ncount, node.op.value)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         self.visit(node.left)
         self.visit(node.right)
 
         for child_node in (node.left, node.right):
-            s = '  node{} -> node{}\n'.format(node._num, child_node._num)
+            s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[child_node])
             self.dot_body.append(s)
 
     def visit_UnOp(self, node, *args, **kwargs):
         s = '  node{} [label="unary {}"]\n'.format(self.ncount, node.op.value)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         self.visit(node.expr)
-        s = '  node{} -> node{}\n'.format(node._num, node.expr._num)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[node.expr])
         self.dot_body.append(s)
 
     def visit_NoOp(self, node, *args, **kwargs):
         s = '  node{} [label="NoOp"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
     def visit_IncludeLibrary(self, node, *args, **kwargs):
@@ -215,7 +216,7 @@ class ASTVisualizer(NodeVisitor):
             node.library_name
         )
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
     def visit_String(self, node, *args, **kwargs):
@@ -224,35 +225,35 @@ class ASTVisualizer(NodeVisitor):
             node.token.value
         )
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
     def visit_IfStmt(self, node, *args, **kwargs):
         s = '  node{} [label="IfStmt"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         self.visit(node.condition)
-        s = '  node{} -> node{} [label="condition"]\n'.format(node._num, node.condition._num)
+        s = '  node{} -> node{} [label="condition"]\n'.format(self.nums[node], self.nums[node.condition])
         self.dot_body.append(s)
 
         self.visit(node.tbody)
-        s = '  node{} -> node{} [label="IF block"]\n'.format(node._num, node.tbody._num)
+        s = '  node{} -> node{} [label="IF block"]\n'.format(self.nums[node], self.nums[node.tbody])
         self.dot_body.append(s)
 
         self.visit(node.fbody)
-        s = '  node{} -> node{} [label="ELSE block"]\n'.format(node._num, node.fbody._num)
+        s = '  node{} -> node{} [label="ELSE block"]\n'.format(self.nums[node], self.nums[node.fbody])
         self.dot_body.append(s)
 
     def visit_ReturnStmt(self, node):
         s = '  node{} [label="ReturnStmt"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         self.visit(node.expression)
-        s = '  node{} -> node{}\n'.format(node._num, node.expression._num)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[node.expression])
         self.dot_body.append(s)
 
     def visit_FunctionCall(self, node):
@@ -261,73 +262,73 @@ class ASTVisualizer(NodeVisitor):
             node.name
         )
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         for i, param_node in enumerate(node.args):
             self.visit(param_node)
-            s = '  node{} -> node{} [label="Arg{:02d}"]\n'.format(node._num, param_node._num, i)
+            s = '  node{} -> node{} [label="Arg{:02d}"]\n'.format(self.nums[node], self.nums[param_node], i)
             self.dot_body.append(s)
 
     def visit_Expression(self, node):
         s = '  node{} [label="Expression"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         for child in node.children:
             self.visit(child)
-            s = '  node{} -> node{}\n'.format(node._num, child._num)
+            s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[child])
             self.dot_body.append(s)
 
     def visit_WhileStmt(self, node):
         s = '  node{} [label="WhileStmt"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         self.visit(node.condition)
-        s = '  node{} -> node{}\n'.format(node._num, node.condition._num)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[node.condition])
         self.dot_body.append(s)
 
         self.visit(node.body)
-        s = '  node{} -> node{}\n'.format(node._num, node.body._num)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[node.body])
         self.dot_body.append(s)
 
     def visit_DoWhileStmt(self, node):
         s = '  node{} [label="DoWhileStmt"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         self.visit(node.condition)
-        s = '  node{} -> node{}\n'.format(node._num, node.condition._num)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[node.condition])
         self.dot_body.append(s)
 
         self.visit(node.body)
-        s = '  node{} -> node{}\n'.format(node._num, node.body._num)
+        s = '  node{} -> node{}\n'.format(self.nums[node], self.nums[node.body])
         self.dot_body.append(s)
 
     def visit_ForStmt(self, node):
         s = '  node{} [label="ForStmt"]\n'.format(self.ncount)
         self.dot_body.append(s)
-        node._num = self.ncount
+        self.nums[node] = self.ncount
         self.ncount += 1
 
         self.visit(node.setup)
-        s = '  node{} -> node{} [label="setup"]\n'.format(node._num, node.setup._num)
+        s = '  node{} -> node{} [label="setup"]\n'.format(self.nums[node], self.nums[node.setup])
         self.dot_body.append(s)
 
         self.visit(node.condition)
-        s = '  node{} -> node{} [label="condition"]\n'.format(node._num, node.condition._num)
+        s = '  node{} -> node{} [label="condition"]\n'.format(self.nums[node], self.nums[node.condition])
         self.dot_body.append(s)
 
         self.visit(node.increment)
-        s = '  node{} -> node{} [label="increment"]\n'.format(node._num, node.increment._num)
+        s = '  node{} -> node{} [label="increment"]\n'.format(self.nums[node], self.nums[node.increment])
         self.dot_body.append(s)
 
         self.visit(node.body)
-        s = '  node{} -> node{} [label="body"]\n'.format(node._num, node.body._num)
+        s = '  node{} -> node{} [label="body"]\n'.format(self.nums[node], self.nums[node.body])
         self.dot_body.append(s)
 
     def gendot(self):
@@ -1,2 +1,47 @@
 # -*- coding:utf8 -*-
-from . import stdio
+import pkgutil
+from ..utils.utils import get_functions
+
+
+class Builtin(object):
+    """ A function of a C library: its name, the names of its return type
+    and of its argument types (None if it takes any arguments) and the
+    python function which runs it """
+    __slots__ = ('name', 'return_type', 'arg_types', 'function')
+
+    def __init__(self, function):
+        self.name = function.__name__
+        self.return_type = function.return_type
+        self.arg_types = function.arg_types
+        self.function = function
+
+    def __repr__(self):
+        return '<Builtin {} {}({})>'.format(
+            self.return_type,
+            self.name,
+            '...' if self.arg_types is None else ', '.join(self.arg_types)
+        )
+
+
+# header name (stdio for stdio.h) -> {function name: Builtin}; filled once,
+# on first use: the modules of the libraries import the interpreter
+_LIBRARIES = None
+
+
+def libraries():
+    """ Every library of this package, each module is one """
+    global _LIBRARIES
+    if _LIBRARIES is None:
+        found = {}
+        for module in pkgutil.iter_modules(__path__):
+            found[module.name] = {
+                function.__name__: Builtin(function)
+                for function in get_functions('{}.{}'.format(__name__, module.name))
+            }
+        _LIBRARIES = found
+    return _LIBRARIES
+
+
+def library(name):
+    """ {function name: Builtin} of the header name.h, None if there is no such library """
+    return libraries().get(name)
@@ -0,0 +1,7 @@
+# -*- coding:utf8 -*-
+""" Front end benchmarks: synthetic C programs of configurable size and shape, and the time,
+throughput and peak memory of lexing, parsing and semantic analysis of them.
+Run `python3 -m interpreter.benchmark --help` from the repository root.
+"""
+from . import corpus
+from . import measure
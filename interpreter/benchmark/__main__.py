@@ -0,0 +1,55 @@
+# -*- coding:utf8 -*-
+import argparse
+import json
+import platform
+import sys
+from .corpus import SHAPES, generate
+from .measure import measure
+from ..lexical_analysis.lexer import SCANNERS
+from ..syntax_analysis.parser import PARSERS
+
+parser = argparse.ArgumentParser(description='Benchmark the front end on synthetic C programs')
+parser.add_argument('shapes', nargs='*', metavar='shape',
+                    help='Shapes of program to generate among {}, all of them by default'.format(
+                        ', '.join(sorted(SHAPES))))
+parser.add_argument('-n', '--scale', type=int, default=1,
+                    help='Multiply the number of functions and structs of each shape')
+parser.add_argument('-r', '--repeat', type=int, default=3,
+                    help='Runs per shape, the best time is kept')
+parser.add_argument('-s', '--scanner', choices=sorted(SCANNERS), default='regex',
+                    help='Lexer used to tokenize the code')
+parser.add_argument('-p', '--parser', choices=sorted(PARSERS), default='recursive',
+                    help='Parser used to parse the code')
+parser.add_argument('--seed', type=int, default=0, help='Seed of the generator')
+parser.add_argument('-o', '--output', help='Write the JSON report to this file')
+
+args = parser.parse_args()
+for shape in args.shapes:
+    if shape not in SHAPES:
+        parser.error('unknown shape {}'.format(shape))
+
+results = []
+for shape in args.shapes or sorted(SHAPES):
+    params = dict(SHAPES[shape], seed=args.seed)
+    for count in ('functions', 'structs'):
+        if count in params:
+            params[count] *= args.scale
+    code = generate(**params)
+    if args.scanner == 'mmap':
+        code = code.encode()
+    result = measure(code, repeat=args.repeat, scanner=args.scanner, parser=args.parser)
+    result.update(shape=shape, params=params)
+    results.append(result)
+
+report = json.dumps({
+    'python': platform.python_version(),
+    'scanner': args.scanner,
+    'parser': args.parser,
+    'scale': args.scale,
+    'results': results,
+}, indent=2)
+if args.output:
+    with open(args.output, 'w') as file:
+        file.write(report + '\n')
+else:
+    sys.stdout.write(report + '\n')
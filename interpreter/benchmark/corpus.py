@@ -0,0 +1,78 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+import random
+
+OPERATORS = ('+', '-', '*', '/', '%', '<', '>', '==', '!=', '&', '|', '^', '<<', '>>')
+
+# Named shapes, each stressing one part of the front end; the counts are
+# for scale 1 and multiplied by the scale of the run.
+SHAPES = {
+    'functions': dict(functions=200, statements=8),
+    'nesting': dict(functions=20, statements=4, depth=40),
+    'comments': dict(functions=20, comment_lines=200),
+    'structs': dict(functions=10, structs=200),
+    'literals': dict(functions=20, digits=300),
+}
+
+
+def expression(rng, depth, digits, names):
+    """ Right leaning expression nested `depth` parentheses deep """
+    leaves = [rng.choice(names) for _ in range(depth + 1)]
+    text = leaves.pop()
+    for leaf in leaves:
+        if rng.random() < 0.3:
+            leaf = str(rng.randrange(1, 10 ** digits))
+        text = '({} {} {})'.format(leaf, rng.choice(OPERATORS), text)
+    return text
+
+
+def generate(functions=10, statements=8, depth=4, comment_lines=0, structs=0, digits=3, seed=0):
+    """ Source of a C program which the whole front end accepts:
+    `structs` struct declarations, then `functions` functions of about
+    `statements` statements each and a main calling them. Expressions are
+    `depth` levels deep, integer literals have up to `digits` digits and
+    every function is preceded by a block comment of `comment_lines` lines. """
+    rng = random.Random(seed)
+    out = ['#include <stdio.h>', '']
+
+    for i in range(structs):
+        out.append('struct s{} {{'.format(i))
+        for j in range(rng.randrange(1, 6)):
+            # member names must be unique program wide, the analyzer declares
+            # them in the enclosing scope
+            out.append('    {} s{}m{};'.format(rng.choice(('int', 'char', 'float', 'double')), i, j))
+        out.append('};')
+    out.append('')
+
+    for i in range(functions):
+        if comment_lines:
+            out.append('/*')
+            out.extend(' * {} {}'.format(i, 'lorem ipsum dolor sit amet ' * 2) for _ in range(comment_lines))
+            out.append(' */')
+        out.append('int f{}(int a, int b) {{'.format(i))
+        out.append('    int x = {}, y = 0;'.format(rng.randrange(10 ** digits)))
+        names = ['a', 'b', 'x', 'y']
+        for _ in range(statements):
+            kind = rng.randrange(5)
+            expr = expression(rng, depth, digits, names)
+            if kind == 0:
+                out.append('    if ({} > y) {{ x = x + 1; }} else {{ y = y - 1; }}'.format(expr))
+            elif kind == 1:
+                out.append('    while (x < {}) {{ x++; }}'.format(expr))
+            elif kind == 2 and i:
+                out.append('    y = f{}(x, {});'.format(rng.randrange(i), expr))
+            else:
+                out.append('    x {} {};'.format(rng.choice(('=', '+=', '-=', '^=')), expr))
+        out.append('    // {} statements'.format(statements))
+        out.append('    return x + y;')
+        out.append('}')
+        out.append('')
+
+    out.append('int main() {')
+    out.append('    int s = 0;')
+    for i in range(functions):
+        out.append('    s = s + f{}(s, {});'.format(i, i))
+    out.append('    printf("%d\\n", s);')
+    out.append('    return 0;')
+    out.append('}')
+    return '\n'.join(out) + '\n'
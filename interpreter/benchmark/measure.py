@@ -0,0 +1,82 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from contextlib import redirect_stdout
+from io import StringIO
+import time
+import tracemalloc
+from ..lexical_analysis.lexer import SCANNERS
+from ..lexical_analysis.buffer import TokenBuffer
+from ..syntax_analysis.parser import PARSERS
+from ..syntax_analysis.tree import tree_stats
+from ..semantic_analysis.analyzer import SemanticAnalyzer
+
+
+def front_end(code, scanner, parser):
+    """ Run the three phases once, yielding after each of them """
+    tokens = TokenBuffer(SCANNERS[scanner](code))
+    yield tokens
+    tree = PARSERS[parser](tokens).parse()
+    yield tree
+    with redirect_stdout(StringIO()):
+        SemanticAnalyzer.analyze(tree)
+    yield tree
+
+
+def phases(code, scanner, parser, clock):
+    """ Reading of clock() taken after each phase, the start reset to zero """
+    readings = []
+    clock(reset=True)
+    for result in front_end(code, scanner, parser):
+        readings.append(clock())
+        clock(reset=True)
+    return readings, result
+
+
+def elapsed():
+    """ Clock measuring the seconds since its last reset """
+    start = [time.perf_counter()]
+
+    def clock(reset=False):
+        now = time.perf_counter()
+        if reset:
+            start[0] = now
+        return now - start[0]
+    return clock
+
+
+def peak_memory(reset=False):
+    """ Clock measuring the peak of traced memory since its last reset """
+    if reset:
+        tracemalloc.reset_peak()
+    return tracemalloc.get_traced_memory()[1]
+
+
+def measure(code, repeat=3, scanner='regex', parser='recursive'):
+    """ Time the lexer, the parser and the semantic analyzer separately on
+    code, keeping the best of `repeat` runs, then trace one more run for the
+    peak memory of every phase. Returns a dict ready to be dumped as JSON. """
+    best = None
+    for _ in range(repeat):
+        seconds, tree = phases(code, scanner, parser, elapsed())
+        best = seconds if best is None else [min(pair) for pair in zip(best, seconds)]
+
+    tracemalloc.start()
+    try:
+        peaks, _ = phases(code, scanner, parser, peak_memory)
+    finally:
+        tracemalloc.stop()
+
+    tokens = len(TokenBuffer(SCANNERS[scanner](code)))
+    stats = tree_stats(tree)
+    nodes = stats['nodes']
+    report = {'chars': len(code), 'tokens': tokens, 'nodes': nodes, 'tree_bytes': stats['bytes']}
+    for name, seconds, peak, units, count in zip(
+            ('lex', 'parse', 'analyze'), best, peaks,
+            ('tokens_per_second', 'nodes_per_second', 'nodes_per_second'),
+            (tokens, nodes, nodes)):
+        report[name] = {
+            'seconds': seconds,
+            units: count / seconds if seconds else None,
+            'peak_bytes': peak,
+        }
+    return report
@@ -0,0 +1,121 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+import hashlib
+import os
+import struct
+import tempfile
+from . import __version__
+from .syntax_analysis import arena
+from .syntax_analysis.arena import NodeArena
+
+# An entry is the length of the warnings of the analyzer, the warnings,
+# utf8 encoded, then the analyzed tree as a serialized NodeArena.
+ENTRY = struct.Struct('<I')
+SUFFIX = '.sci'
+MAX_SIZE = 64 * 1024 * 1024
+
+
+def cache_directory():
+    """ $XDG_CACHE_HOME/cinterpreter, ~/.cache/cinterpreter by default """
+    root = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(root, 'cinterpreter')
+
+
+class Cache(object):
+    """ Analyzed trees of the programs already run, kept on disk.
+    Entries are named after a hash of the source, of the scanner and of
+    the versions of the interpreter and of the arena format, so an upgrade
+    never reads an old entry. Once the entries take more than max_size
+    bytes, the least recently used ones are removed. """
+
+    def __init__(self, directory=None, max_size=MAX_SIZE):
+        self.directory = directory or cache_directory()
+        self.max_size = max_size
+
+    def key(self, code, scanner='regex'):
+        """ Name of the entry of the source code, a str, bytes or mmap. The
+        scanner is part of it: offsets count bytes for some, chars for others. """
+        digest = hashlib.sha256('{}:{}:{}:'.format(__version__, arena.VERSION, scanner).encode())
+        digest.update(code.encode() if isinstance(code, str) else code)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def load(self, key):
+        """ (tree, warnings) stored under key, None if there is none """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            os.utime(path)
+        except OSError:
+            return None
+        try:
+            length, = ENTRY.unpack_from(data)
+            warnings = data[ENTRY.size:ENTRY.size + length].decode()
+            tree = NodeArena.from_buffer(data[ENTRY.size + length:]).tree()
+        except Exception:
+            # truncated or foreign file: drop it, the program is analyzed again
+            self.remove(path)
+            return None
+        return tree, warnings
+
+    def store(self, key, tree, warnings=''):
+        """ Write the entry of key, then evict the oldest ones if the cache
+        grew too large. The entry is written to a temporary file renamed
+        over the final name, so a reader never sees half an entry. Failing
+        to write is not an error: the program simply is not cached. """
+        warnings = warnings.encode()
+        data = ENTRY.pack(len(warnings)) + warnings + NodeArena(tree).to_bytes()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'wb') as file:
+                    file.write(data)
+                os.replace(temporary, self.path(key))
+            except BaseException:
+                self.remove(temporary)
+                raise
+        except OSError:
+            return
+        self.evict()
+
+    def entries(self):
+        """ (last use, size, path) of every entry """
+        result = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return result
+        for name in names:
+            if name.endswith(SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                result.append((stat.st_mtime, stat.st_size, path))
+        return result
+
+    def evict(self):
+        """ Remove the least recently used entries until they fit in max_size """
+        entries = sorted(self.entries())
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            self.remove(path)
+            size -= entry_size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self.remove(path)
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
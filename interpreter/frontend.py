@@ -0,0 +1,79 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+from itertools import repeat
+import mmap
+import os
+import time
+from .lexical_analysis.lexer import SCANNERS
+from .lexical_analysis.buffer import TokenBuffer
+from .syntax_analysis.parser import PARSERS
+from .semantic_analysis.analyzer import SemanticAnalyzer
+
+# Outcome of the front end for one file: the analyzed tree, or the error
+# which stopped it, the warnings of the analyzer and the seconds spent in
+# each phase (None for the phases which were not reached).
+# Everything in it pickles, so it can come back from a worker process.
+FrontEnd = namedtuple('FrontEnd', 'path tree error warnings lex_time parse_time analyze_time')
+
+
+def read(path, scanner='regex'):
+    """ Source of the file at path, in the form the scanner expects """
+    if scanner == 'mmap':
+        # the mapping is scanned in place, the file is never read into memory
+        with open(path, 'rb') as file:
+            if not os.path.getsize(path):
+                return b''
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    with open(path, 'r') as file:
+        return file.read()
+
+
+def front_end(path, scanner='regex', parser='recursive'):
+    """ Lex, parse and analyze the file at path """
+    tree = error = None
+    times = [None, None, None]
+    output = StringIO()
+    try:
+        code = read(path, scanner)
+        try:
+            start = time.perf_counter()
+            tokens = TokenBuffer(SCANNERS[scanner](code))
+            times[0] = time.perf_counter() - start
+            tokens.lines.detach()
+        finally:
+            # the tokens and the line table hold all the later phases need
+            if isinstance(code, mmap.mmap):
+                code.close()
+
+        start = time.perf_counter()
+        tree = PARSERS[parser](tokens).parse()
+        times[1] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with redirect_stdout(output):
+            SemanticAnalyzer.analyze(tree)
+        times[2] = time.perf_counter() - start
+    except Exception as exception:
+        tree, error = None, exception
+    return FrontEnd(path, tree, error, output.getvalue().splitlines(), *times)
+
+
+def front_end_batch(paths, jobs=None, scanner='regex', parser='recursive'):
+    """ Run the front end over many files, spread over `jobs` worker
+    processes (one per core by default). Results are in the order of paths. """
+    paths = list(paths)
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) < 2:
+        return [front_end(path, scanner, parser) for path in paths]
+
+    # a few chunks per worker keeps them all busy without paying one
+    # round trip per file on batches of many small sources
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(jobs) as executor:
+        return list(executor.map(
+            front_end, paths, repeat(scanner), repeat(parser), chunksize=chunksize
+        ))
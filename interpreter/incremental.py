@@ -0,0 +1,211 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from .lexical_analysis.lexer import RegexLexer
+from .lexical_analysis.buffer import TokenBuffer
+from .lexical_analysis.token_type import ID, LBRACKET
+from .syntax_analysis.parser import PARSERS
+from .syntax_analysis.tree import LazyBody, FunctionDecl, Program
+from .syntax_analysis.arena import KIND_INDEX, LAYOUTS, NODE, NODES
+from .semantic_analysis.analyzer import SemanticAnalyzer
+
+
+class Declaration(object):
+    """ A top level declaration: the nodes parsed from the tokens
+    [start, stop), the global names they declare, their signature (the
+    tokens outside of a function body) and the identifiers they refer to.
+    Its index in the program is its position for the SymbolTable. """
+    __slots__ = ('nodes', 'start', 'stop', 'names', 'signature', 'references', 'index')
+
+    def __init__(self, nodes, start, stop, tokens):
+        self.nodes = nodes
+        self.start = start
+        self.stop = stop
+        self.names = []
+        self.index = None
+        kinds, values = tokens.kinds, tokens.values
+        end = stop
+        if isinstance(nodes[0], FunctionDecl):
+            end = start
+            while kinds[end] != LBRACKET:
+                end += 1
+        self.signature = tuple(zip(kinds[start:end], values[start:end]))
+        self.references = {
+            tokens.names.names[values[index]] for index in range(start, stop) if kinds[index] == ID
+        }
+
+
+def shift(nodes, tokens, chars):
+    """ Move nodes which come after an edit by `tokens` tokens and `chars`
+    chars; function bodies not loaded yet are moved as a whole """
+    seen = set()
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if node is None or id(node) in seen:
+            continue
+        seen.add(id(node))
+        node.offset += chars
+        if type(node) is LazyBody:
+            node.start += tokens
+            node.stop += tokens
+            continue
+        for name, encoding in LAYOUTS[KIND_INDEX[type(node)]]:
+            if encoding == NODE:
+                stack.append(getattr(node, name))
+            elif encoding == NODES:
+                stack.extend(getattr(node, name))
+
+
+class Compilation(object):
+    """ A program kept parsed and analyzed across edits of its source.
+    edit() scans the text again around the edit, parses again only the top
+    level declarations it touches and analyzes them again, along with the
+    declarations which refer to a name whose signature changed. The other
+    declarations keep their nodes and symbols, the ones after the edit are
+    only moved. A declaration analyzed again only sees the globals of the
+    ones before it, as in a whole compilation. If an edit does not compile,
+    the next one compiles the whole program again.
+    Unless strict, function bodies are parsed and analyzed on first call. """
+
+    def __init__(self, text, parser='recursive', strict=True):
+        self.text = text
+        self.parser_name = parser
+        self.strict = strict
+        self.tree = None
+        self.compile()
+
+    def compile(self):
+        """ Parse and analyze the whole text; returns the tree """
+        self.tree = None
+        self.tokens = TokenBuffer(RegexLexer(self.text))
+        self.parser = PARSERS[self.parser_name](self.tokens, lazy=not self.strict)
+        self.declarations, _ = self.parse_declarations(0, len(self.tokens) - 1, [])
+        self.number()
+        self.users = {}
+        for declaration in self.declarations:
+            self.use(declaration)
+
+        tree = self.program()
+        self.analyzer = SemanticAnalyzer(self.strict)
+        self.analyzer.enter_program(tree)
+        for declaration in self.declarations:
+            declaration.names = self.analyzer.declare(declaration.nodes, declaration)
+        self.analyzer.check_main()
+        self.tree = tree
+        return tree
+
+    def edit(self, offset, deleted, inserted):
+        """ Remove `deleted` chars at offset and put `inserted` in their
+        place, then bring the tree up to date; returns it """
+        if self.tree is None:
+            self.text = self.text[:offset] + inserted + self.text[offset + deleted:]
+            return self.compile()
+
+        # the text follows the edit even if it does not compile
+        text = self.text
+        self.text = text[:offset] + inserted + text[offset + deleted:]
+        self.tree = None
+        relexed = self.tokens.relex(text, offset, deleted, inserted)
+        tokens = relexed.new_stop - relexed.old_stop
+        chars = len(inserted) - deleted
+
+        # the declarations with tokens scanned again, in the old positions
+        declarations = self.declarations
+        first = 0
+        while first < len(declarations) and declarations[first].stop <= relexed.first:
+            first += 1
+        last = first
+        while last < len(declarations) and declarations[last].start < relexed.old_stop:
+            last += 1
+        start, stop = relexed.first, relexed.old_stop
+        if first < last:
+            start = min(start, declarations[first].start)
+            stop = max(stop, declarations[last - 1].stop)
+        stop = min(stop + tokens, len(self.tokens) - 1)
+
+        following = declarations[last:]
+        for declaration in following:
+            declaration.start += tokens
+            declaration.stop += tokens
+        shift([node for declaration in following for node in declaration.nodes], tokens, chars)
+
+        changed, swallowed = self.parse_declarations(start, stop, following)
+        replaced = declarations[first:last + swallowed]
+        declarations[first:last + swallowed] = changed
+        self.number()
+        for declaration in replaced:
+            self.unuse(declaration)
+        for declaration in changed:
+            self.use(declaration)
+
+        analyzer = self.analyzer
+        analyzer.lines = self.tokens.lines
+        old = {name: declaration.signature for declaration in replaced for name in declaration.names}
+        for declaration in replaced:
+            analyzer.forget(declaration.names, declaration)
+        for declaration in changed:
+            declaration.names = analyzer.declare(declaration.nodes, declaration)
+        new = {name: declaration.signature for declaration in changed for name in declaration.names}
+        self.reanalyze(
+            {name for name in set(old) | set(new) if old.get(name) != new.get(name)},
+            set(changed)
+        )
+        analyzer.check_main()
+
+        self.tree = self.program()
+        return self.tree
+
+    def parse_declarations(self, start, stop, following):
+        """ Declarations of the tokens from start up to stop. A declaration
+        which runs past stop takes the place of the `following` ones it
+        overlaps; returns the declarations and the count of those. """
+        parser = self.parser
+        parser.reset(start)
+        declarations = []
+        swallowed = 0
+        while parser.pos < stop:
+            if not parser.check_external_declaration():
+                parser.error("Expected token <EOF> but found <{}>".format(parser.current_token.name))
+            start = parser.pos
+            nodes = parser.external_declaration()
+            declarations.append(Declaration(nodes, start, parser.pos, self.tokens))
+            while parser.pos > stop and swallowed < len(following):
+                stop = following[swallowed].stop
+                swallowed += 1
+        return declarations, swallowed
+
+    def reanalyze(self, names, done):
+        """ Analyze again the declarations which refer to one of names, then
+        those which refer to a struct or variable they declare, and so on """
+        while names:
+            users = {declaration for name in names for declaration in self.users.get(name, ())}
+            users -= done
+            done |= users
+            names = set()
+            for declaration in sorted(users, key=lambda declaration: declaration.start):
+                self.analyzer.forget(declaration.names, declaration)
+                declaration.names = self.analyzer.declare(declaration.nodes, declaration)
+                # a function body is not part of its signature
+                if not isinstance(declaration.nodes[0], FunctionDecl):
+                    names.update(declaration.names)
+
+    def number(self):
+        """ Index the declarations in their order in the program """
+        for index, declaration in enumerate(self.declarations):
+            declaration.index = index
+
+    def use(self, declaration):
+        for name in declaration.references:
+            self.users.setdefault(name, set()).add(declaration)
+
+    def unuse(self, declaration):
+        for name in declaration.references:
+            self.users[name].discard(declaration)
+
+    def program(self):
+        return Program(
+            declarations=[node for declaration in self.declarations for node in declaration.nodes],
+            offset=0,
+            lines=self.tokens.lines,
+            names=self.tokens.names
+        )
@@ -1,18 +1,44 @@
 # -*- coding:utf8 -*-
+from contextlib import redirect_stdout
+from io import StringIO
 from queue import Queue
+from threading import Event
 from .memory import *
-from .number import Number
-from ..lexical_analysis.lexer import Lexer
+from .number import Number, BITS, MASK
+from ..lexical_analysis.lexer import SCANNERS
 from ..lexical_analysis.token_type import *
-from ..syntax_analysis.parser import Parser
+from ..syntax_analysis.parser import PARSERS
 from ..syntax_analysis.tree import *
 from ..semantic_analysis.analyzer import SemanticAnalyzer
-from ..utils.utils import get_functions, MessageColor
+from ..utils.utils import MessageColor
+from ..__builtins__ import library
 from copy import deepcopy
 import sys
 
 CQueue = Queue()
 
+# BinOp on int operands as python ints, with the results Number would give.
+# LOG_AND_OP and LOG_OR_OP, which may not evaluate their right operand, are
+# in Interpreter.int_value.
+INT_OPERATORS = {
+    ADD_OP: lambda left, right: (left + right) & MASK,
+    SUB_OP: lambda left, right: (left - right) & MASK,
+    MUL_OP: lambda left, right: (left * right) & MASK,
+    DIV_OP: lambda left, right: left // right,
+    MOD_OP: lambda left, right: left % right,
+    LT_OP: lambda left, right: int(left < right),
+    GT_OP: lambda left, right: int(left > right),
+    LE_OP: lambda left, right: int(left <= right),
+    GE_OP: lambda left, right: int(left >= right),
+    EQ_OP: lambda left, right: int(left == right),
+    NE_OP: lambda left, right: int(left != right),
+    AND_OP: lambda left, right: left & right,
+    OR_OP: lambda left, right: left | right,
+    XOR_OP: lambda left, right: left ^ right,
+    LEFT_OP: lambda left, right: (left << right % BITS) & MASK,
+    RIGHT_OP: lambda left, right: left >> right % BITS,
+}
+
 def _recurse_name(node, name=""):
     if isinstance(node, Var):
         return node.value
@@ -21,10 +47,7 @@ def _recurse_name(node, name=""):
 
 def bp_wrapper(func):
     def wrapper(self, node):
-        if (node.line, node.char) in self.break_points:
-            CQueue.put(((node.line, node.char), deepcopy(self.memory)))
-            self.can_run.clear()
-        self.can_run.wait()
+        self.break_point(node)
         return func(self, node)
     return wrapper
 
@@ -34,17 +57,22 @@ class Interpreter(NodeVisitor):
         self.memory = Memory()
         self.structs = Structs()
         self.break_points = break_points
+        self.break_offsets = set()
+        self.lines = None
         self.can_run = event
         self.can_run.set()
 
+    def break_point(self, node):
+        """ Pause on the node if a break point was set at the position it starts at """
+        if node.offset in self.break_offsets:
+            CQueue.put((self.lines.position(node.offset), deepcopy(self.memory)))
+            self.can_run.clear()
+        self.can_run.wait()
+
     def load_libraries(self, tree):
         for node in filter(lambda o: isinstance(o, IncludeLibrary), tree.children):
-            functions = get_functions('interpreter.__builtins__.{}'.format(
-                node.library_name
-            ))
-
-            for function in functions:
-                self.memory[function.__name__] = function
+            for name, builtin in library(node.library_name).items():
+                self.memory[name] = builtin.function
 
     def load_functions(self, tree):
         for node in filter(lambda o: isinstance(o, FunctionDecl), tree.children):
@@ -60,7 +88,7 @@ class Interpreter(NodeVisitor):
             self.visit(var)
 
     def visit_VarDecl(self, node):
-        self.memory.declare(node.var_node.value)
+        self.memory.define(node.var_node)
 
     @bp_wrapper
     def visit_StructDecl(self, node):
@@ -69,8 +97,8 @@ class Interpreter(NodeVisitor):
     @bp_wrapper
     def visit_FunctionDecl(self, node):
         for i, param in enumerate(node.params):
-            self.memory[param.var_node.value] = self.memory.stack.current_frame.current_scope._values.pop(i)
-        return self.visit(node.body)
+            self.memory.define(param.var_node, self.memory.stack.current_frame.current_scope._values.pop(i))
+        return self.visit(node.load_body())
 
     @bp_wrapper
     def visit_FunctionBody(self, node):
@@ -96,8 +124,7 @@ class Interpreter(NodeVisitor):
             self.memory.new_frame(node.name)
 
             for i, arg in enumerate(args):
-                self.memory.declare(i)
-                self.memory[i] = arg
+                self.memory.declare(i, arg)
 
             res = self.visit(self.memory[node.name])
             self.memory.del_frame()
@@ -111,11 +138,11 @@ class Interpreter(NodeVisitor):
             if node.op.type == AND_OP:
                 return node.expr.value
             elif node.op.type == INC_OP :
-                self.memory[node.expr.value] += Number(1)
-                return self.memory[node.expr.value]
+                self.memory.store(node.expr, self.memory.load(node.expr) + Number(1))
+                return self.memory.load(node.expr)
             elif node.op.type == DEC_OP:
-                self.memory[node.expr.value] -= Number(1)
-                return self.memory[node.expr.value]
+                self.memory.store(node.expr, self.memory.load(node.expr) - Number(1))
+                return self.memory.load(node.expr)
             elif node.op.type == SUB_OP:
                 return Number(-1) * self.visit(node.expr)
             elif node.op.type == ADD_OP:
@@ -128,12 +155,12 @@ class Interpreter(NodeVisitor):
                 return Number(res.val)
         else:
             if node.op.type == INC_OP :
-                var = self.memory[node.expr.value]
-                self.memory[node.expr.value] += Number(1)
+                var = self.memory.load(node.expr)
+                self.memory.store(node.expr, var + Number(1))
                 return var
             elif node.op.type == DEC_OP:
-                var = self.memory[node.expr.value]
-                self.memory[node.expr.value] -= Number(1)
+                var = self.memory.load(node.expr)
+                self.memory.store(node.expr, var - Number(1))
                 return var
 
         return self.visit(node.expr)
@@ -149,13 +176,7 @@ class Interpreter(NodeVisitor):
 
     def visit_ReturnStmt(self, node):
         value = self.visit(node.expression)
-        self.can_run.wait()
-        if (node.line, node.char) in self.break_points:
-            CQueue.put(((node.line, node.char), deepcopy(self.memory)))
-            self.can_run.clear()
-        elif (node.line, node.char-1) in self.break_points:
-            CQueue.put(((node.line, node.char-1), deepcopy(self.memory)))
-            self.can_run.clear()
+        self.break_point(node)
         return value
 
     @bp_wrapper
@@ -167,16 +188,10 @@ class Interpreter(NodeVisitor):
 
     @bp_wrapper
     def visit_Var(self, node):
-        return self.memory[node.value]
+        return self.memory.load(node)
 
     def visit_StructVar(self, node):
-        if (node.line, node.char) in self.break_points:
-            CQueue.put(((node.line, node.char), deepcopy(self.memory)))
-            self.can_run.clear()
-        elif (node.line, node.char-1) in self.break_points:
-            CQueue.put(((node.line, node.char-1), deepcopy(self.memory)))
-            self.can_run.clear()
-        self.can_run.wait()
+        self.break_point(node)
         name = _recurse_name(node)
         return self.memory[node.struct_name][name]
 
@@ -198,28 +213,54 @@ class Interpreter(NodeVisitor):
                 self.memory[var_name][sub_name] /= self.visit(node.right)
             else:
                 self.memory[var_name][sub_name] = self.visit(node.right)
-        else:
+            self.break_point(node)
+            return self.memory[var_name]
+
+        var = node.left
+        if node.op.type in (ADD_ASSIGN, SUB_ASSIGN, MUL_ASSIGN, DIV_ASSIGN):
+            value = self.memory.load(var)
             if node.op.type == ADD_ASSIGN:
-                self.memory[var_name] += self.visit(node.right)
+                value += self.visit(node.right)
             elif node.op.type == SUB_ASSIGN:
-                self.memory[var_name] -= self.visit(node.right)
+                value -= self.visit(node.right)
             elif node.op.type == MUL_ASSIGN:
-                self.memory[var_name] *= self.visit(node.right)
-            elif node.op.type == DIV_ASSIGN:
-                self.memory[var_name] /= self.visit(node.right)
+                value *= self.visit(node.right)
             else:
-                self.memory[var_name] = self.visit(node.right)
-        if (node.line, node.char) in self.break_points:
-            CQueue.put(((node.line, node.char), deepcopy(self.memory)))
-            self.can_run.clear()
-        self.can_run.wait()
-        return self.memory[var_name]
+                value /= self.visit(node.right)
+        else:
+            value = self.visit(node.right)
+        self.memory.store(var, value)
+        self.break_point(node)
+        return self.memory.load(var)
 
     @bp_wrapper
     def visit_NoOp(self, node):
         pass
 
+    def int_value(self, node):
+        """ Value of an expression as a python int. The int typed BinOp,
+        Num and Var under it are computed without Number wrappers for the
+        intermediate values nor break points, other nodes are visited. """
+        kind = type(node)
+        if kind is Var:
+            return self.memory.load(node).val
+        if kind is Num and node.token.type == INTEGER_CONST:
+            return node.value & MASK
+        if kind is BinOp and node.ctype == 'int':
+            op = node.op.type
+            if op in INT_OPERATORS:
+                return INT_OPERATORS[op](self.int_value(node.left), self.int_value(node.right))
+            if op == LOG_AND_OP:
+                return self.int_value(node.left) and self.int_value(node.right)
+            if op == LOG_OR_OP:
+                return self.int_value(node.left) or self.int_value(node.right)
+        return self.visit(node).val
+
     def visit_BinOp(self, node):
+        if (node.ctype == 'int' and not self.break_offsets
+                and (node.op.type in INT_OPERATORS or node.op.type in (LOG_AND_OP, LOG_OR_OP))):
+            # the analyzer typed it int: no break point can stop inside
+            return Number(self.int_value(node))
         if node.op.type == ADD_OP:
             value = self.visit(node.left) + self.visit(node.right)
         elif node.op.type == SUB_OP:
@@ -252,10 +293,11 @@ class Interpreter(NodeVisitor):
             value = self.visit(node.left) | self.visit(node.right)
         elif node.op.type == XOR_OP:
             value = self.visit(node.left) ^ self.visit(node.right)
-        if (node.line, node.char) in self.break_points:
-            CQueue.put(((node.line, node.char), deepcopy(self.memory)))
-            self.can_run.clear()
-        self.can_run.wait()
+        elif node.op.type == LEFT_OP:
+            value = self.visit(node.left) << self.visit(node.right)
+        elif node.op.type == RIGHT_OP:
+            value = self.visit(node.left) >> self.visit(node.right)
+        self.break_point(node)
         return value
 
 
@@ -274,21 +316,9 @@ class Interpreter(NodeVisitor):
     def visit_WhileStmt(self, node):
         self.can_run.wait()
         if self.visit(node.condition):
-            if (node.line, node.char) in self.break_points:
-                CQueue.put(((node.line, node.char), deepcopy(self.memory)))
-                self.can_run.clear()
-            elif (node.line, node.char+5) in self.break_points:
-                CQueue.put(((node.line, node.char+5), deepcopy(self.memory)))
-                self.can_run.clear()
-            self.can_run.wait()
+            self.break_point(node)
             self.visit(node.body)
-            if (node.line, node.char) in self.break_points:
-                CQueue.put(((node.line, node.char), deepcopy(self.memory)))
-                self.can_run.clear()
-            elif (node.line, node.char+5) in self.break_points:
-                CQueue.put(((node.line, node.char+5), deepcopy(self.memory)))
-                self.can_run.clear()
-            self.can_run.wait()
+            self.break_point(node)
             self.visit(node)
 
     @bp_wrapper
@@ -299,6 +329,10 @@ class Interpreter(NodeVisitor):
             self.visit(node.increment)
 
     def interpret(self, tree):
+        self.lines = tree.lines
+        self.break_offsets = {
+            self.lines.offset(line, char) for line, char in self.break_points
+        }
         self.load_libraries(tree)
         self.load_functions(tree)
         self.load_structs(tree)
@@ -310,13 +344,25 @@ class Interpreter(NodeVisitor):
         return res
 
     @staticmethod
-    def run(program):
+    def run(program, scanner='regex', parser='recursive', cache=None, strict=True):
+        """ Run the program; with a Cache, a program analyzed before is
+        read back from it instead of being lexed, parsed and analyzed.
+        Unless strict, function bodies are only parsed and analyzed on their
+        first call: errors in functions never called are not reported. """
+        analyzer = None
         try:
-            lexer = Lexer(program)
-            parser = Parser(lexer)
-            tree = parser.parse()
-            SemanticAnalyzer.analyze(tree)
-            status = Interpreter().interpret(tree)
+            entry = key = None
+            if cache is not None:
+                key = cache.key(program, scanner)
+                entry = cache.load(key)
+            if entry is not None:
+                tree, warnings = entry
+                print(warnings, end='')
+            else:
+                lexer = SCANNERS[scanner](program)
+                tree = PARSERS[parser](lexer, lazy=not strict).parse()
+                analyzer = SemanticAnalyzer.analyze(tree, strict)
+            status = Interpreter([], Event()).interpret(tree)
         except Exception as message:
             print("{}[{}] {} {}".format(
                 MessageColor.FAIL,
@@ -327,5 +373,18 @@ class Interpreter(NodeVisitor):
             status = -1
         print()
         print(MessageColor.OKBLUE + "Process terminated with status {}".format(status) + MessageColor.ENDC)
+        if cache is not None and analyzer is not None:
+            Interpreter.store(cache, key, tree, analyzer)
 
-
+    @staticmethod
+    def store(cache, key, tree, analyzer):
+        """ Put an analyzed tree in the cache, once the bodies of the
+        functions which were not called are loaded as well; a program with
+        an error in one of them is not cached """
+        try:
+            with redirect_stdout(StringIO()):
+                for node in filter(lambda o: isinstance(o, FunctionDecl), tree.children):
+                    node.load_body()
+        except Exception:
+            return
+        cache.store(key, tree, ''.join(warning + '\n' for warning in analyzer.warnings))
@@ -8,22 +8,37 @@ class Scope(object):
         self.scope_name = scope_name
         self.parent_scope = parent_scope
         self._values = dict()
+        # variables the semantic analyzer resolved are kept by index in
+        # slots, _slots gives the index of their names
+        self.slots = []
+        self._slots = dict()
+
+    def define(self, key, slot, value):
+        if slot >= len(self.slots):
+            self.slots.extend([None] * (slot + 1 - len(self.slots)))
+        self.slots[slot] = value
+        self._slots[key] = slot
 
     def __setitem__(self, key, value):
-        self._values[key] = value
+        if key in self._slots:
+            self.slots[self._slots[key]] = value
+        else:
+            self._values[key] = value
 
     def __getitem__(self, item):
+        if item in self._slots:
+            return self.slots[self._slots[item]]
         return self._values[item]
 
     def __contains__(self, key):
-        return key in self._values
+        return key in self._slots or key in self._values
 
     def keys(self):
-        return self._values.keys()
+        return list(self._slots) + list(self._values)
 
     def __repr__(self):
         lines = [
-            '{}:{}'.format(key, val) for key, val in self._values.items()
+            '{}:{}'.format(key, self[key]) for key in self.keys()
         ]
         title = '{}\n'.format(self.scope_name)
         return title + '\n'.join(lines)
@@ -136,6 +151,33 @@ class Memory(object):
         ins_scope = self.stack.current_frame.current_scope if self.stack.current_frame else self.global_frame.current_scope
         ins_scope[key] = value
 
+    def define(self, var, value=0):
+        """ Declare the variable of a Var node, at the slot the semantic analyzer gave it """
+        if var.slot is None:
+            return self.declare(var.value, value)
+        if var.depth == 1:
+            self.global_frame.current_scope.define(var.value, var.slot, value)
+        else:
+            self.stack.current_frame.scopes[var.depth - 2].define(var.value, var.slot, value)
+
+    def load(self, var):
+        """ Value of the variable of a Var node, read from its slot.
+        Depth 1 is the global scope, depth 2 the outermost scope of the
+        current function and each block nested in it adds one. """
+        if var.slot is None:
+            return self[var.value]
+        if var.depth == 1:
+            return self.global_frame.current_scope.slots[var.slot]
+        return self.stack.current_frame.scopes[var.depth - 2].slots[var.slot]
+
+    def store(self, var, value):
+        if var.slot is None:
+            self[var.value] = value
+        elif var.depth == 1:
+            self.global_frame.current_scope.slots[var.slot] = value
+        else:
+            self.stack.current_frame.scopes[var.depth - 2].slots[var.slot] = value
+
     def __setitem__(self, key, value):
         splitted = []
         if '.' in key:
@@ -1,5 +1,9 @@
 # -*- coding:utf8 -*-
-from ctypes import c_uint
+from ctypes import c_uint, sizeof
+
+# c_uint(value).value, for values computed on python ints
+BITS = 8 * sizeof(c_uint)
+MASK = (1 << BITS) - 1
 
 class Number(object):
 
@@ -86,6 +90,14 @@ class Number(object):
         """ self ^ other """
         return Number(int(self.val ^ other.val))
 
+    def __lshift__(self, other):
+        """ self << other, the count taken modulo the width as x86 does """
+        return Number(self.val << other.val % BITS)
+
+    def __rshift__(self, other):
+        """ self >> other, the count taken modulo the width as x86 does """
+        return Number(self.val >> other.val % BITS)
+
 
     def __bool__(self):
         return bool(self.value)
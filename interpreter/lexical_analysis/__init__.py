@@ -9,3 +9,4 @@ is that it makes the parser simpler, and decouples it from the character encodin
 from . import token_type
 from . import token
 from . import lexer
+from . import buffer
@@ -0,0 +1,137 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from .token_type import *
+from .token import Token
+from .lexer import RESERVED_KEYWORDS, PUNCTUATORS, RegexLexer
+from .names import NameTable
+
+# Keywords, punctuators and EOF always carry the same value, so the buffer
+# hands out one shared token per kind instead of storing their values.
+FIXED_TOKENS = {
+    token.type: token for token in list(RESERVED_KEYWORDS.values()) + list(PUNCTUATORS.values())
+}
+FIXED_TOKENS[EOF] = Token(EOF, None)
+
+# Outcome of TokenBuffer.relex: old tokens [first, old_stop) were replaced by
+# the new tokens [first, new_stop); the tokens after them are unchanged.
+Relexed = namedtuple('Relexed', 'text first old_stop new_stop')
+
+
+class TokenBuffer(object):
+    """ The whole token stream of a program, stored in parallel compact arrays.
+    Token i is described by its kind kinds[i], its value constants[values[i]]
+    and the offset of its first char offsets[i]; `lines` maps offsets back
+    to (line, char) positions. The values of ID tokens are instead their
+    symbol ids in the `names` table shared with the lexer. """
+
+    def __init__(self, lexer=None):
+        self.kinds = array('B')
+        self.values = array('I')
+        self.offsets = array('I')
+        self.constants = [None]
+        self.lines = None
+        self.names = NameTable()
+        # the lexer class which scanned the text, relex scans with it again
+        self.scanner = RegexLexer
+        self._constant_index = {}
+        if lexer is not None:
+            self.tokenize(lexer)
+
+    def tokenize(self, lexer):
+        """ Pull every token out of the lexer, up to and including EOF """
+        self.lines = lexer.lines
+        self.names = lexer.names
+        self.scanner = type(lexer)
+        for token in lexer.tokens():
+            self.append(token, lexer.start)
+        return self
+
+    def append(self, token, offset):
+        self.kinds.append(token.type)
+        self.values.append(self.constant(token))
+        self.offsets.append(offset)
+
+    def constant(self, token):
+        """ Index of the token value in the constant pool """
+        if token.type in FIXED_TOKENS:
+            return 0
+        if token.type == ID:
+            return token.symbol
+        key = (type(token.value), token.value)
+        index = self._constant_index.get(key)
+        if index is None:
+            index = self._constant_index[key] = len(self.constants)
+            self.constants.append(token.value)
+        return index
+
+    def relex(self, text, offset, deleted, inserted):
+        """ Apply an edit to the source text: `deleted` chars removed at
+        `offset`, then `inserted` put in their place. Only the tokens from the
+        last one which starts before the edit are scanned again, until a new
+        token starts where an old one did past the edit; from there on the
+        text, and so the stream, is the same as before. This holds across
+        comments and string literals too, since the scanner carries no state
+        from one token to the next.
+        Offsets and lengths are in the unit of the scanner of the buffer,
+        bytes for a MappedLexer, and inserted is of the type of the text.
+        The buffer is updated in place; returns a Relexed. """
+        text = text[:offset] + inserted + text[offset + deleted:]
+        delta = len(inserted) - deleted
+        edit_end = offset + len(inserted)
+
+        first = bisect_left(self.offsets, offset) - 1
+        lexer = self.scanner(text, self.names)
+        if first < 0:
+            first = 0
+        else:
+            lexer.seek(self.offsets[first])
+
+        tokens = []
+        starts = array('I')
+        old_stop = len(self)
+        for token in lexer.tokens():
+            if lexer.start >= edit_end:
+                index = bisect_left(self.offsets, lexer.start - delta)
+                if index < len(self) and self.offsets[index] == lexer.start - delta:
+                    old_stop = index
+                    break
+            tokens.append(token)
+            starts.append(lexer.start)
+
+        self.kinds[first:old_stop] = array('B', [token.type for token in tokens])
+        self.values[first:old_stop] = array('I', [self.constant(token) for token in tokens])
+        self.offsets[first:] = starts + array('I', [start + delta for start in self.offsets[old_stop:]])
+        self.lines = lexer.lines
+        return Relexed(text, first, old_stop, first + len(tokens))
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def position(self, index):
+        """ (line, char) of the first char of token index """
+        return self.lines.position(self.offsets[index])
+
+    def kind(self, index):
+        return self.kinds[index]
+
+    def value(self, index):
+        kind = self.kinds[index]
+        if kind in FIXED_TOKENS:
+            return FIXED_TOKENS[kind].value
+        if kind == ID:
+            return self.names.names[self.values[index]]
+        return self.constants[self.values[index]]
+
+    def token(self, index):
+        """ Token object at index; tokens past the end read as EOF """
+        if index >= len(self.kinds):
+            index = len(self.kinds) - 1
+        kind = self.kinds[index]
+        if kind in FIXED_TOKENS:
+            return FIXED_TOKENS[kind]
+        if kind == ID:
+            return self.names.tokens[self.values[index]]
+        return Token(kind, self.constants[self.values[index]])
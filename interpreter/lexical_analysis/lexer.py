@@ -1,7 +1,10 @@
 # -*- coding:utf8 -*-
 """ SCI - Simple C Interpreter """
+import re
 from .token_type import *
 from .token import Token
+from .lines import LineIndex
+from .names import NameTable
 
 RESERVED_KEYWORDS = {
     'char': Token(CHAR, 'char'),
@@ -21,26 +24,107 @@ RESERVED_KEYWORDS = {
 }
 
 
+PUNCTUATORS = {
+    '<<=': Token(LEFT_ASSIGN, '<<='),
+    '>>=': Token(RIGHT_ASSIGN, '>>='),
+    '+=': Token(ADD_ASSIGN, '+='),
+    '-=': Token(SUB_ASSIGN, '-='),
+    '*=': Token(MUL_ASSIGN, '*='),
+    '/=': Token(DIV_ASSIGN, '/='),
+    '%=': Token(MOD_ASSIGN, '%='),
+    '&=': Token(AND_ASSIGN, '&='),
+    '^=': Token(XOR_ASSIGN, '^='),
+    '|=': Token(OR_ASSIGN, '|='),
+    '>>': Token(RIGHT_OP, '>>'),
+    '<<': Token(LEFT_OP, '<<'),
+    '++': Token(INC_OP, '++'),
+    '--': Token(DEC_OP, '--'),
+    '&&': Token(LOG_AND_OP, '&&'),
+    '||': Token(LOG_OR_OP, '||'),
+    '<=': Token(LE_OP, '<='),
+    '>=': Token(GE_OP, '>='),
+    '==': Token(EQ_OP, '=='),
+    '!=': Token(NE_OP, '!='),
+    '<': Token(LT_OP, '<'),
+    '>': Token(GT_OP, '>'),
+    '=': Token(ASSIGN, '='),
+    '!': Token(LOG_NEG, '!'),
+    '&': Token(AND_OP, '&'),
+    '|': Token(OR_OP, '|'),
+    '^': Token(XOR_OP, '^'),
+    '+': Token(ADD_OP, '+'),
+    '-': Token(SUB_OP, '-'),
+    '*': Token(MUL_OP, '*'),
+    '/': Token(DIV_OP, '/'),
+    '%': Token(MOD_OP, '%'),
+    '(': Token(LPAREN, '('),
+    ')': Token(RPAREN, ')'),
+    '{': Token(LBRACKET, '{'),
+    '}': Token(RBRACKET, '}'),
+    ';': Token(SEMICOLON, ';'),
+    ':': Token(COLON, ':'),
+    ',': Token(COMMA, ','),
+    '.': Token(DOT, '.'),
+    '#': Token(HASH, '#'),
+    '?': Token(QUESTION_MARK, '?'),
+}
+
+
+def punctuator_trie(punctuators):
+    """ Trie of the punctuator lexemes, one nested dict per char;
+    the '' key of a node holds the token spelled by the path to it. """
+    root = {}
+    for lexeme, token in punctuators.items():
+        node = root
+        for char in lexeme:
+            node = node.setdefault(char, {})
+        node[''] = token
+    return root
+
+
+# Every prefix of a C punctuator is a punctuator itself, so the longest match
+# is found by walking the trie as far as the input allows, never backing up.
+PUNCTUATOR_TRIE = punctuator_trie(PUNCTUATORS)
+
+
 class LexicalError(Exception):
     """ Class was created to isolate lexical errors """
     pass
 
 
 class Lexer(object):
-    def __init__(self, text):
-        self.text = text.replace('\\n', '\n')
+    def __init__(self, text, names=None):
+        self.text = text
+        self.lines = LineIndex(text)
+        self.names = NameTable() if names is None else names
         self.pos = 0
-        self.current_char = self.text[self.pos]
-        self.line = 1
-        self.char = 0
+        self.start = 0  # offset of the first char of the last token
+        self.current_char = self.text[self.pos] if self.text else None
+
+    @property
+    def line(self):
+        """ Line of the last token, computed from the line index on demand """
+        return self.lines.position(self.start)[0]
 
     def error(self, message):
         raise LexicalError(message)
 
+    def tokens(self):
+        """ Generate the tokens one at a time, up to and including EOF """
+        while True:
+            token = self.get_next_token
+            yield token
+            if token.type == EOF:
+                return
+
+    def seek(self, pos):
+        """ Scan on from the char at pos """
+        self.pos = pos
+        self.current_char = self.text[pos] if pos < len(self.text) else None
+
     def advance(self):
         """ Advance the `pos` pointer and set the `current_char` variable. """
         self.pos += 1
-        self.char += 1
 
         if self.pos > len(self.text) - 1:
             self.current_char = None  # Indicates end of input
@@ -58,17 +142,12 @@ class Lexer(object):
     def skip_whitespace(self):
         """ Skip all whitespaces between tokens from input """
         while self.current_char is not None and self.current_char.isspace():
-            if self.current_char == '\n':
-                self.char = -1
-                self.line += 1
             self.advance()
 
     def skip_comment(self):
         """ Skip single line comment """
         while self.current_char is not None:
             if self.current_char == '\n':
-                self.char = -1
-                self.line += 1
                 self.advance()
                 return
             self.advance()
@@ -80,9 +159,6 @@ class Lexer(object):
                 self.advance()
                 self.advance()
                 return
-            if self.current_char == '\n':
-                self.char = -1
-                self.line += 1
             self.advance()
         self.error("Unterminated comment at line {}".format(self.line))
 
@@ -111,7 +187,7 @@ class Lexer(object):
         """ Return string written in code without double quotes"""
         result = ''
         self.advance()
-        while self.current_char is not '"':
+        while self.current_char != '"':
             if self.current_char is None:
                 self.error(
                     message='Unfinished string with \'"\' at line {}'.format(self.line)
@@ -119,12 +195,15 @@ class Lexer(object):
             result += self.current_char
             self.advance()
         self.advance()
-        return Token(STRING, result)
+        return Token(STRING, result.replace('\\n', '\n'))
 
     def char(self):
         """ Handle chars between single quotes """
         self.advance()
         char = self.current_char
+        if char == '\\' and self.peek(1) == 'n':
+            self.advance()
+            char = '\n'
         self.advance()
         if self.current_char != '\'':
             self.error("Unclosed char constant at line {}".format(self.line))
@@ -138,9 +217,17 @@ class Lexer(object):
             result += self.current_char
             self.advance()
 
-        token = RESERVED_KEYWORDS.get(result, Token(ID, result))
+        token = RESERVED_KEYWORDS.get(result) or self.names.token(result)
         return token
 
+    def punctuator(self):
+        """ Longest punctuator at the current position, in one step per char """
+        node = PUNCTUATOR_TRIE
+        while self.current_char in node:
+            node = node[self.current_char]
+            self.advance()
+        return node['']
+
     @property
     def get_next_token(self):
         """ Lexical analyzer (also known as scanner or tokenizer)
@@ -148,6 +235,7 @@ class Lexer(object):
         apart into tokens. One token at a time. """
 
         while self.current_char is not None:
+            self.start = self.pos
 
             if self.current_char.isspace():
                 self.skip_whitespace()
@@ -173,198 +261,123 @@ class Lexer(object):
             if self.current_char == '\'':
                 return self.char()
 
-            if self.current_char == '<' and self.peek(1) == '<' and self.peek(2) == '=':
-                self.advance()
-                self.advance()
-                self.advance()
-                return Token(LEFT_ASSIGN, '<<=')
-
-            if self.current_char == '>' and self.peek(1) == '>' and self.peek(2) == '=':
-                self.advance()
-                self.advance()
-                self.advance()
-                return Token(RIGHT_ASSIGN, '>>=')
-
-            if self.current_char == '+' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return Token(ADD_ASSIGN, '+=')
-
-            if self.current_char == '-' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return Token(SUB_ASSIGN, '-=')
+            if self.current_char in PUNCTUATOR_TRIE:
+                return self.punctuator()
 
-            if self.current_char == '*' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return Token(MUL_ASSIGN, '*=')
-
-            if self.current_char == '/' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return Token(DIV_ASSIGN, '/=')
-
-            if self.current_char == '%' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return Token(MOD_ASSIGN, '%=')
-
-            if self.current_char == '&' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return Token(AND_ASSIGN, '&=')
-
-            if self.current_char == '^' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return Token(XOR_ASSIGN, '^=')
-
-            if self.current_char == '|' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return Token(OR_ASSIGN, '|=')
-
-            if self.current_char == '>' and self.peek(1) == '>':
-                self.advance()
-                self.advance()
-                return Token(RIGHT_OP, '>>')
-
-            if self.current_char == '<' and self.peek(1) == '<':
-                self.advance()
-                self.advance()
-                return Token(LEFT_OP, '<<')
-
-            if self.current_char == '+' and self.peek(1) == '+':
-                self.advance()
-                self.advance()
-                return Token(INC_OP, '++')
-
-            if self.current_char == '-' and self.peek(1) == '-':
-                self.advance()
-                self.advance()
-                return Token(DEC_OP, '--')
-
-            if self.current_char == '&' and self.peek(1) == '&':
-                self.advance()
-                self.advance()
-                return Token(LOG_AND_OP, '&&')
-
-            if self.current_char == '|' and self.peek(1) == '|':
-                self.advance()
-                self.advance()
-                return Token(LOG_OR_OP, '||')
-
-            if self.current_char == '<' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return Token(LE_OP, '<=')
-
-            if self.current_char == '>' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return Token(GE_OP, '>=')
-
-            if self.current_char == '=' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return Token(EQ_OP, '==')
-
-            if self.current_char == '!' and self.peek(1) == '=':
-                self.advance()
-                self.advance()
-                return Token(NE_OP, '!=')
-
-            if self.current_char == '<':
-                self.advance()
-                return Token(LT_OP, '<')
+            self.error(
+                message="Invalid char {} at line {}".format(self.current_char, self.line)
+            )
 
-            if self.current_char == '>':
-                self.advance()
-                return Token(GT_OP, '>')
+        self.start = self.pos
+        return Token(EOF, None)
 
-            if self.current_char == '=':
-                self.advance()
-                return Token(ASSIGN, '=')
 
-            if self.current_char == '!':
-                self.advance()
-                return Token(LOG_NEG, '!')
 
-            if self.current_char == '&':
-                self.advance()
-                return Token(AND_OP, '&')
+# One alternation for the whole token grammar. Whitespace and comments are
+# consumed as a prefix of the next token, so every match yields exactly one
+# token. Order matters: an unterminated comment before the '/' punctuator and
+# punctuators longest first, so that '<<=' wins over '<'.
+MASTER_PATTERN = re.compile(
+    r'(?:\s+|//[^\n]*|/\*.*?\*/)*(?:' + '|'.join((
+        r'(?P<UNTERMINATED_COMMENT>/\*)',
+        r'(?P<PUNCTUATOR>{})'.format('|'.join(
+            re.escape(punctuator) for punctuator in sorted(PUNCTUATORS, key=len, reverse=True)
+        )),
+        r'(?P<ID>[^\W\d_][^\W_]*)',
+        r'(?P<NUMBER>\d+(?:\.\d*)?)',
+        r'(?P<STRING>"[^"]*")',
+        r'(?P<CHAR>\'(?:\\n|.)\')',
+        r'(?P<EOF>\Z)',
+        r'(?P<INVALID>.)',
+    )) + ')',
+    re.DOTALL
+)
+
+
+class RegexLexer(Lexer):
+    """ Lexer which scans the text with one compiled master pattern.
+    It emits the same tokens, with the same start offsets, as the
+    character by character `Lexer`. """
+
+    def __init__(self, text, names=None):
+        self.text = text
+        self.lines = LineIndex(text)
+        self.names = NameTable() if names is None else names
+        self.pos = 0
+        self.start = 0
 
-            if self.current_char == '|':
-                self.advance()
-                return Token(OR_OP, '|')
+    def seek(self, pos):
+        self.pos = pos
 
-            if self.current_char == '^':
-                self.advance()
-                return Token(XOR_OP, '|')
+    @property
+    def get_next_token(self):
+        """ Match MASTER_PATTERN once at the current position and
+        build the token from the group which matched. """
+        match = MASTER_PATTERN.match(self.text, self.pos)
+        kind = match.lastgroup
+        value = match.group(kind)
+        self.pos = match.end()
+        self.start = self.pos - len(value)
+        return self.token(kind, value)
 
-            if self.current_char == '+':
-                self.advance()
-                return Token(ADD_OP, '+')
+    def token(self, kind, value):
+        """ Build the token for the text matched by the group kind """
+        if kind == 'PUNCTUATOR':
+            return PUNCTUATORS[value]
 
-            if self.current_char == '-':
-                self.advance()
-                return Token(SUB_OP, '-')
+        if kind == 'ID':
+            return RESERVED_KEYWORDS.get(value) or self.names.token(value)
 
-            if self.current_char == '*':
-                self.advance()
-                return Token(MUL_OP, '*')
+        if kind == 'NUMBER':
+            if '.' in value:
+                return Token(REAL_CONST, float(value))
+            return Token(INTEGER_CONST, int(value))
 
-            if self.current_char == '/':
-                self.advance()
-                return Token(DIV_OP, '/')
+        if kind == 'STRING':
+            return Token(STRING, value[1:-1].replace('\\n', '\n'))
 
-            if self.current_char == '%':
-                self.advance()
-                return Token(MOD_OP, '%')
+        if kind == 'CHAR':
+            return Token(CHAR_CONST, ord(value[1:-1].replace('\\n', '\n')))
 
-            if self.current_char == '(':
-                self.advance()
-                return Token(LPAREN, '(')
+        if kind == 'EOF':
+            return Token(EOF, None)
 
-            if self.current_char == ')':
-                self.advance()
-                return Token(RPAREN, ')')
+        if kind == 'UNTERMINATED_COMMENT':
+            self.error("Unterminated comment at line {}".format(self.line))
 
-            if self.current_char == '{':
-                self.advance()
-                return Token(LBRACKET, '{')
+        if value == '"':
+            self.error(
+                message='Unfinished string with \'"\' at line {}'.format(self.line)
+            )
 
-            if self.current_char == '}':
-                self.advance()
-                return Token(RBRACKET, '}')
+        if value == '\'':
+            self.error("Unclosed char constant at line {}".format(self.line))
 
-            if self.current_char == ';':
-                self.advance()
-                return Token(SEMICOLON, ';')
+        self.error(
+            message="Invalid char {} at line {}".format(value, self.line)
+        )
 
-            if self.current_char == ':':
-                self.advance()
-                return Token(COLON, ':')
 
-            if self.current_char == ',':
-                self.advance()
-                return Token(COMMA, ',')
+BYTES_MASTER_PATTERN = re.compile(MASTER_PATTERN.pattern.encode(), re.DOTALL)
 
-            if self.current_char == '.':
-                self.advance()
-                return Token(DOT, '.')
 
-            if self.current_char == '#':
-                self.advance()
-                return Token(HASH, '#')
+class MappedLexer(RegexLexer):
+    """ Lexer which scans a bytes-like buffer, typically a read only mmap
+    of the source file, without ever holding the text as a str.
+    Only the value of each token is decoded; offsets count bytes. The
+    master pattern is ASCII only in this mode, like C identifiers. """
 
-            if self.current_char == '?':
-                self.advance()
-                return Token(QUESTION_MARK, '?')
+    @property
+    def get_next_token(self):
+        match = BYTES_MASTER_PATTERN.match(self.text, self.pos)
+        kind = match.lastgroup
+        self.pos = match.end()
+        self.start = match.start(kind)
+        return self.token(kind, match.group(kind).decode('utf-8', 'replace'))
 
-            self.error(
-                message="Invalid char {} at line {}".format(self.current_char, self.line)
-            )
 
-        return Token(EOF, None)
+SCANNERS = {
+    'regex': RegexLexer,
+    'classic': Lexer,
+    'mmap': MappedLexer,
+}
@@ -0,0 +1,51 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from array import array
+from bisect import bisect_right
+import re
+
+NEWLINE = re.compile('\n')
+BYTES_NEWLINE = re.compile(b'\n')
+
+
+class LineIndex(object):
+    """ Offsets at which the lines of a text start.
+    Tokens and nodes only record char offsets; this index turns an offset
+    into a (line, char) position, both counted from 1, when a diagnostic,
+    a break point or a visualizer asks for one. The table itself is only
+    built on the first request. The text may be a str or any bytes-like
+    buffer, such as a mmap. """
+
+    def __init__(self, text):
+        self.text = text
+        self._starts = None
+
+    @property
+    def starts(self):
+        if self._starts is None:
+            newline = NEWLINE if isinstance(self.text, str) else BYTES_NEWLINE
+            self._starts = array('I', [0])
+            self._starts.extend(match.end() for match in newline.finditer(self.text))
+        return self._starts
+
+    def detach(self):
+        """ Build the table and drop the text, which may then be closed """
+        self.starts
+        self.text = None
+
+    def position(self, offset):
+        """ (line, char) of the char at offset """
+        starts = self.starts
+        line = bisect_right(starts, offset)
+        return line, offset - starts[line - 1] + 1
+
+    def offset(self, line, char):
+        """ Offset of the char at (line, char) """
+        starts = self.starts
+        if not 1 <= line <= len(starts):
+            raise ValueError('Line {} is out of the text, which has {} lines'.format(line, len(starts)))
+        return starts[line - 1] + char - 1
+
+    def __getstate__(self):
+        # the table is much smaller than the text it was built from
+        return {'text': None, '_starts': self.starts}
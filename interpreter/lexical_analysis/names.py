@@ -0,0 +1,33 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from .token_type import ID
+from .token import Token
+
+
+class NameTable(object):
+    """ Intern table of the identifiers of a program.
+    Each distinct name gets a dense integer id, in order of first appearance,
+    and a single ID token shared by all of its uses. Later stages can index
+    by `symbol` instead of hashing the name, and the names they do hash are
+    one str object per identifier. """
+
+    def __init__(self):
+        self.names = []     # symbol -> name
+        self.tokens = []    # symbol -> shared ID token
+        self._symbols = {}  # name -> symbol
+
+    def __len__(self):
+        return len(self.names)
+
+    def symbol(self, name):
+        """ Id of name, interning it on first sight """
+        return self.token(name).symbol
+
+    def token(self, name):
+        """ The ID token of name, interning it on first sight """
+        symbol = self._symbols.get(name)
+        if symbol is None:
+            symbol = self._symbols[name] = len(self.names)
+            self.names.append(name)
+            self.tokens.append(Token(ID, name, symbol))
+        return self.tokens[symbol]
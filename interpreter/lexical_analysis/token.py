@@ -1,11 +1,22 @@
 # -*- coding:utf8 -*-
+from .token_type import TOKEN_NAMES
+
+
 class Token(object):
     """ This class represents Token
-    Output from Lexical analysis is list of tokens"""
+    Output from Lexical analysis is list of tokens
+    ID tokens also carry the `symbol` id of their name in the NameTable"""
+    __slots__ = ('type', 'value', 'symbol')
 
-    def __init__(self, type, value):
+    def __init__(self, type, value, symbol=None):
         self.type = type
         self.value = value
+        self.symbol = symbol
+
+    @property
+    def name(self):
+        """ Printable name of the token kind """
+        return TOKEN_NAMES[self.type]
 
     def __str__(self):
         """String representation of the class instance.
@@ -15,7 +26,7 @@ class Token(object):
             Token(MUL, '*')
         """
         return 'Token({type}, {value})'.format(
-            type=self.type,
+            type=self.name,
             value=repr(self.value)
         )
 
@@ -1,35 +1,41 @@
 # -*- coding:utf8 -*-
-CHAR, INT, FLOAT, DOUBLE, VOID, STRUCT = 'CHAR', 'INT', 'FLOAT', 'DOUBLE', 'VOID', 'STRUCT'
-CHAR_CONST, INTEGER_CONST, REAL_CONST = 'CHAR_CONST', 'INTEGER_CONST', 'REAL_CONST'
-STRING = 'STRING'
-
-ADD_OP, SUB_OP = 'ADD_OP', 'SUB_OP'
-MUL_OP, DIV_OP, MOD_OP = 'MUL_OP', 'DIV_OP', 'MOD_OP'
-INC_OP, DEC_OP = 'INC_OP', 'DEC_OP'
-AND_OP, OR_OP, XOR_OP = 'AND_OP', 'OR_OP', 'XOR_OP'
-LEFT_OP, RIGHT_OP = 'LEFT_OP', 'RIGHT_OP'
-LT_OP, GT_OP = 'LT', 'GT'
-LE_OP, GE_OP = 'LE_OP', 'GE_OP'
-EQ_OP, NE_OP = 'EQ_OP', 'NE_OP'
-LOG_AND_OP, LOG_OR_OP, LOG_NEG = 'LOG_AND_OP', 'LOG_OR_OP', 'LOG_NEG'
-
-ASSIGN, MUL_ASSIGN, DIV_ASSIGN = 'ASSIGN', 'MUL_ASSIGN', 'DIV_ASSIGN'
-MOD_ASSIGN, ADD_ASSIGN, SUB_ASSIGN = 'MOD_ASSIGN', 'ADD_ASSIGN', 'SUB_ASSIGN'
-LEFT_ASSIGN, RIGHT_ASSIGN = 'LEFT_ASSIGN', 'RIGHT_ASSIGN'
-AND_ASSIGN, XOR_ASSIGN, OR_ASSIGN = 'AND_ASSIGN', 'XOR_ASSIGN', 'OR_ASSIGN'
-
-LPAREN, RPAREN = 'LPAREN', 'RPAREN'
-LBRACKET, RBRACKET = 'LBRACKET', 'RBRACKET'
-
-COMMA, DOT, SEMICOLON, HASH = 'COMMA', 'DOT', 'SEMICOLON', 'HASH'
-COLON, QUESTION_MARK = 'COLON', 'QUESTION_MARK'
-
-ID = 'ID'
-IF, ELSE, FOR, WHILE, RETURN, DO = 'IF', 'ELSE', 'FOR', 'WHILE', 'RETURN', 'DO'
-BREAK, CONTINUE = 'BREAK', 'CONTINUE'
-
-EOF = 'EOF'
-
-
-
-
+CHAR, INT, FLOAT, DOUBLE, VOID, STRUCT = range(0, 6)
+CHAR_CONST, INTEGER_CONST, REAL_CONST = range(6, 9)
+STRING = 9
+
+ADD_OP, SUB_OP = range(10, 12)
+MUL_OP, DIV_OP, MOD_OP = range(12, 15)
+INC_OP, DEC_OP = range(15, 17)
+AND_OP, OR_OP, XOR_OP = range(17, 20)
+LEFT_OP, RIGHT_OP = range(20, 22)
+LT_OP, GT_OP = range(22, 24)
+LE_OP, GE_OP = range(24, 26)
+EQ_OP, NE_OP = range(26, 28)
+LOG_AND_OP, LOG_OR_OP, LOG_NEG = range(28, 31)
+
+ASSIGN, MUL_ASSIGN, DIV_ASSIGN = range(31, 34)
+MOD_ASSIGN, ADD_ASSIGN, SUB_ASSIGN = range(34, 37)
+LEFT_ASSIGN, RIGHT_ASSIGN = range(37, 39)
+AND_ASSIGN, XOR_ASSIGN, OR_ASSIGN = range(39, 42)
+
+LPAREN, RPAREN = range(42, 44)
+LBRACKET, RBRACKET = range(44, 46)
+
+COMMA, DOT, SEMICOLON, HASH = range(46, 50)
+COLON, QUESTION_MARK = range(50, 52)
+
+ID = 52
+IF, ELSE, FOR, WHILE, RETURN, DO = range(53, 59)
+BREAK, CONTINUE = range(59, 61)
+
+EOF = 61
+
+# Printable names of the token kinds, used for error messages and visualizers
+TOKEN_NAMES = {
+    kind: name for name, kind in list(globals().items()) if name.isupper()
+}
+
+ASSIGNMENT_OPS = frozenset((
+    ASSIGN, MUL_ASSIGN, DIV_ASSIGN, MOD_ASSIGN, ADD_ASSIGN, SUB_ASSIGN,
+    LEFT_ASSIGN, RIGHT_ASSIGN, AND_ASSIGN, XOR_ASSIGN, OR_ASSIGN,
+))
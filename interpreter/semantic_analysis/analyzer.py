@@ -1,11 +1,26 @@
 # -*- coding:utf8 -*-
-from ..syntax_analysis.tree import NodeVisitor, Type, StructDecl, VarDecl, FunctionDecl
+from functools import partial
+from ..syntax_analysis.tree import NodeVisitor, Type, StructDecl, VarDecl, FunctionDecl, LazyBody
 from ..syntax_analysis.parser import INTEGER_CONST, CHAR_CONST, AND_OP, OR_OP, XOR_OP
 from .table import *
-from ..utils.utils import get_functions, get_name, MessageColor
+from ..utils.utils import MessageColor
+from ..__builtins__ import library
 
 
 SIZES = {int:1, float:2}
+TYPES = dict(char=int, int=int, float=float, double=float)
+
+
+class AnalysisContext(object):
+    """ What one analysis learns about types: the structs it defined, by
+    name, the python type or size of each type name and the size of each
+    type. Every analyzer has its own, starting from the builtin types, so
+    analyses running side by side never see each other's structs. """
+
+    def __init__(self):
+        self.dtypes = {}
+        self.types = dict(TYPES)
+        self.sizes = dict(SIZES)
 
 class SemanticError(Exception):
     pass
@@ -15,21 +30,20 @@ class TypeError(UserWarning):
 
 
 class SemanticAnalyzer(NodeVisitor):
-    _dtypes = {}
 
     class DataType():
-        def __new__(cls, node, scope, *args, **kwargs):
-            if node.struct_name in SemanticAnalyzer._dtypes:
-                if scope == SemanticAnalyzer._dtypes[node.struct_name].scope:
-                    raise SemanticError("redefinition of struct %s at line %s" %
-                                        node.struct_name, node.line)
+        def __new__(cls, node, scope, context, *args, **kwargs):
+            if node.struct_name in context.dtypes:
+                if scope == context.dtypes[node.struct_name].scope:
+                    raise SemanticError("redefinition of struct %s" % node.struct_name)
                 else:
-                    return SemanticAnalyzer._dtypes[node.struct_name]
+                    return context.dtypes[node.struct_name]
             return object.__new__(cls, *args, **kwargs)
 
-        def __init__(self, node, scope):
+        def __init__(self, node, scope, context):
             self.name = node.struct_name
             self.scope = scope
+            self.context = context
             self._attr = {}
             for i in node.struct_body:
                 if isinstance(i, VarDecl):
@@ -44,16 +58,17 @@ class SemanticAnalyzer(NodeVisitor):
 
 
         def _compute_size(self):
+            sizes = self.context.sizes
             size = 0
             for attribute in [item for item in self._attr if type(item) not in ["scope", "name"]]:
                 if isinstance(attribute, SemanticAnalyzer.CType):
-                    size += SIZES[SemanticAnalyzer.CType.types[attribute.type]]
+                    size += sizes[self.context.types[attribute.type]]
                 elif isinstance(attribute, SemanticAnalyzer.DataType):
-                    size += SIZES[attribute]
+                    size += sizes[attribute]
                 else:
                     #raise SemanticError("Unkown Type %s" % attribute)
                     pass
-            SIZES[self] = size
+            sizes[self] = size
             return size
 
         def _calc_type(self, other):
@@ -66,8 +81,8 @@ class SemanticAnalyzer(NodeVisitor):
 
 
         def __eq__(self, other):
-            if isintance(other, CType):
-                return  SIZES[self] == SIZES[other.type]
+            if isinstance(other, SemanticAnalyzer.CType):
+                return  self.context.sizes[self] == self.context.sizes[other.type]
 
         def __repr__(self):
             return '{}'.format(self.name)
@@ -76,22 +91,23 @@ class SemanticAnalyzer(NodeVisitor):
             return self.__repr__()
 
     class CType(object):
-        types = dict(char=int, int=int, float=float, double=float)
         order = ('char', 'int', 'float', 'double')
 
-        def __init__(self, ttype):
+        def __init__(self, ttype, context):
             self.type = ttype
+            self.context = context
 
         def _calc_type(self, other):
             left_order = SemanticAnalyzer.CType.order.index(self.type)
             right_order = SemanticAnalyzer.CType.order.index(other.type)
-            return SemanticAnalyzer.CType(SemanticAnalyzer.CType.order[max(left_order, right_order)])
+            return SemanticAnalyzer.CType(SemanticAnalyzer.CType.order[max(left_order, right_order)], self.context)
 
         def __add__(self, other):
             return self._calc_type(other)
 
         def __eq__(self, other):
-            return SemanticAnalyzer.CType.types[self.type] == SemanticAnalyzer.CType.types[other.type]
+            types = self.context.types
+            return types[self.type] == types[other.type]
 
         def __repr__(self):
             return '{}'.format(self.type)
@@ -99,57 +115,117 @@ class SemanticAnalyzer(NodeVisitor):
         def __str__(self):
             return self.__repr__()
 
-    def __init__(self):
-        self.current_scope = None
+    def __init__(self, strict=True, history=False):
+        self.table = None
+        self.context = None
+        self.lines = None
+        # lazy function bodies are analyzed along with the program when
+        # strict, otherwise on their first call
+        self.strict = strict
+        # keep the closed scopes in the symbol table, to print them
+        self.history = history
+        self.warnings = []
 
     def error(self, message):
         raise SemanticError(message)
 
+    def line(self, node):
+        """ Line of the node, for diagnostics """
+        return self.lines.position(node.offset)[0]
+
     def warning(self, message):
-        print(MessageColor.WARNING + message + MessageColor.ENDC)
+        message = MessageColor.WARNING + message + MessageColor.ENDC
+        self.warnings.append(message)
+        print(message)
 
     def visit_Program(self, node):
-        global_scope = ScopedSymbolTable(
-            scope_name='global',
-            scope_level=1,
-            enclosing_scope=self.current_scope,
-        )
-        global_scope._init_builtins()
-        self.current_scope = global_scope
+        self.enter_program(node)
 
-        for child in node.children:
+        for index, child in enumerate(node.children):
+            self.table.position = Position(index)
             self.visit(child)
+        self.table.position = None
+
+        self.check_main()
+
+    def enter_program(self, node):
+        # the global scope stays open once the program is analyzed, for the
+        # lazy function bodies and the declarations analyzed again
+        self.lines = node.lines
+        self.table = SymbolTable(self.history)
+        self.context = AnalysisContext()
+        self.table.enter('global')
+        self.table._init_builtins()
+
+    def ctype(self, ttype):
+        """ CType of a type name, in the context of this analysis """
+        return SemanticAnalyzer.CType(ttype, self.context)
 
-        if not self.current_scope.lookup('main'):
+    @staticmethod
+    def typed(node, ctype):
+        """ Record on the expression node the name of its type; returns ctype """
+        node.ctype = ctype.type if ctype is not None else None
+        return ctype
+
+    def check_main(self):
+        if not self.table.lookup('main'):
             self.error(
                 "Error: Undeclared mandatory function main"
             )
 
-        self.current_scope = self.current_scope.enclosing_scope
+    def declare(self, nodes, position):
+        """ Analyze the nodes of a top level declaration in the global scope
+        of the program, once it was analyzed, seeing only the globals of the
+        declarations up to position; returns the names declared """
+        mark = len(self.table.log)
+        self.table.position = position
+        try:
+            for node in nodes:
+                self.visit(node)
+        finally:
+            self.table.position = None
+        return self.table.log[mark:]
+
+    def forget(self, names, position):
+        """ Remove names returned by declare from the global scope """
+        self.table.position = position
+        try:
+            for name in names:
+                symbol = self.table.forget(name)
+                if isinstance(symbol, SemanticAnalyzer.DataType):
+                    self.context.dtypes.pop(name, None)
+        finally:
+            self.table.position = None
 
     def visit_VarDecl(self, node):
         """ type_node var_node """
 
         type_name = node.type_node.value
-        type_symbol = self.current_scope.lookup(type_name)
+        type_symbol = self.table.lookup(type_name)
 
         var_name = node.var_node.value
         var_symbol = VarSymbol(var_name, type_symbol)
 
-        if self.current_scope.lookup(var_name, current_scope_only=True):
+        if self.table.lookup(var_name, current_scope_only=True):
             self.error(
                 "Error: Duplicate identifier '{}' found at line {}".format(
                     var_name,
-                    node.line
+                    self.line(node)
                 )
             )
 
-        self.current_scope.insert(var_symbol)
+        self.table.insert(var_symbol)
+        self.address(node.var_node, var_symbol, self.table.scope)
+
+    def address(self, var, symbol, scope):
+        """ Record in a Var node where the interpreter keeps its variable """
+        var.depth = scope.scope_level
+        var.slot = symbol.slot
 
     def visit_StructType(self, node):
         """ struct StructName var_node"""
 
-        dtype = SemanticAnalyzer.DataType(node, self.current_scope)
+        dtype = SemanticAnalyzer.DataType(node, self.table.scope, self.context)
         for child in node.struct_body:
             self.visit(child)
             if isinstance(child, VarDecl):
@@ -159,45 +235,50 @@ class SemanticAnalyzer(NodeVisitor):
             else:
                 #raise TypeError("Type %s unknown" % node)
                 pass
-            value = self.current_scope.lookup(label, current_scope_only=True)
+            value = self.table.lookup(label, current_scope_only=True)
             dtype._attr[label] = value
-        SemanticAnalyzer.CType.types.update({dtype.name: dtype._compute_size()})
-        SemanticAnalyzer._dtypes[node.struct_name] = dtype
-        self.current_scope.insert(dtype)
+        self.context.types.update({dtype.name: dtype._compute_size()})
+        self.context.dtypes[node.struct_name] = dtype
+        self.table.insert(dtype)
 
     def visit_StructDecl(self, node):
         """ type_node var_node """
 
         struct_type = node.struct_type
-        type_symbol = self.current_scope.lookup(struct_type)
+        type_symbol = self.table.lookup(struct_type)
 
         var_name = node.struct_name
         var_symbol = StructSymbol(var_name, type_symbol, type_symbol._attr)
 
-        if self.current_scope.lookup(var_name, current_scope_only=True):
+        if self.table.lookup(var_name, current_scope_only=True):
             self.error(
                 "Error: Duplicate identifier '{}' found at line {}".format(
                     var_name,
-                    node.line
+                    self.line(node)
                 )
             )
 
-        self.current_scope.insert(var_symbol)
+        self.table.insert(var_symbol)
 
 
 
     def visit_IncludeLibrary(self, node):
         """ #include <library_name.h> """
 
-        functions = get_functions('interpreter.__builtins__.{}'.format(
-            node.library_name
-        ))
+        functions = library(node.library_name)
+        if functions is None:
+            self.error(
+                "Library '{}.h' not found at line {}".format(
+                    node.library_name,
+                    self.line(node)
+                )
+            )
 
-        for func in functions:
-            type_symbol = self.current_scope.lookup(func.return_type)
+        for func in functions.values():
+            type_symbol = self.table.lookup(func.return_type)
 
-            func_name = func.__name__
-            if self.current_scope.lookup(func_name):
+            func_name = func.name
+            if self.table.lookup(func_name):
                 continue
 
             func_symbol = FunctionSymbol(func_name, type=type_symbol)
@@ -206,39 +287,52 @@ class SemanticAnalyzer(NodeVisitor):
                 func_symbol.params = None
             else:
                 for i, param_type in enumerate(func.arg_types):
-                    type_symbol = self.current_scope.lookup(param_type)
+                    type_symbol = self.table.lookup(param_type)
                     var_symbol = VarSymbol('param{:02d}'.format(i + 1), type_symbol)
                     func_symbol.params.append(var_symbol)
 
-            self.current_scope.insert(func_symbol)
+            self.table.insert(func_symbol)
 
     def visit_FunctionDecl(self, node):
         """ type_node  func_name ( params ) body """
 
         type_name = node.type_node.value
-        type_symbol = self.current_scope.lookup(type_name)
+        type_symbol = self.table.lookup(type_name)
 
         func_name = node.func_name
-        if self.current_scope.lookup(func_name):
+        if self.table.lookup(func_name):
             self.error(
-                "Error: Duplicate identifier '{}' found at line {}".format(func_name, node.line)
+                "Error: Duplicate identifier '{}' found at line {}".format(func_name, self.line(node))
             )
         func_symbol = FunctionSymbol(func_name, type=type_symbol)
-        self.current_scope.insert(func_symbol)
+        self.table.insert(func_symbol)
 
-        procedure_scope = ScopedSymbolTable(
-            scope_name=func_name,
-            scope_level=self.current_scope.scope_level + 1,
-            enclosing_scope=self.current_scope
-        )
-        self.current_scope = procedure_scope
+        self.table.enter(func_name)
 
         for param in node.params:
             func_symbol.params.append(self.visit(param))
 
-        self.visit(node.body)
-
-        self.current_scope = self.current_scope.enclosing_scope
+        if isinstance(node.body, LazyBody) and not self.strict:
+            node.body.analyze = partial(self.analyze_body, func_symbol, self.table.position)
+        else:
+            self.visit(node.load_body())
+
+        self.table.exit()
+
+    def analyze_body(self, func_symbol, position, body):
+        """ Analyze a lazy function body once parsed, in a scope of its
+        function opened again, with the symbols of its parameters. It sees
+        the globals declared up to its function only, as when strict. """
+        outer = self.table.position
+        self.table.position = position
+        self.table.enter(func_symbol.name)
+        try:
+            for param in func_symbol.params:
+                self.table.insert(param)
+            self.visit(body)
+        finally:
+            self.table.exit()
+            self.table.position = outer
 
     def visit_FunctionBody(self, node):
         """ { children } """
@@ -249,36 +343,32 @@ class SemanticAnalyzer(NodeVisitor):
         """ type_node var_node """
 
         type_name = node.type_node.value
-        type_symbol = self.current_scope.lookup(type_name)
+        type_symbol = self.table.lookup(type_name)
 
         var_name = node.var_node.value
         var_symbol = VarSymbol(var_name, type_symbol)
 
-        if self.current_scope.lookup(var_name, current_scope_only=True):
+        if self.table.lookup(var_name, current_scope_only=True):
             self.error(
                 "Error: Duplicate identifier '{}' found at line {}".format(
                     var_name,
-                    node.line
+                    self.line(node)
                 )
             )
 
-        self.current_scope.insert(var_symbol)
+        self.table.insert(var_symbol)
+        self.address(node.var_node, var_symbol, self.table.scope)
         return var_symbol
 
     def visit_CompoundStmt(self, node):
         """ { children } """
 
-        procedure_scope = ScopedSymbolTable(
-            scope_name=get_name(self.current_scope.scope_name),
-            scope_level=self.current_scope.scope_level + 1,
-            enclosing_scope=self.current_scope
-        )
-        self.current_scope = procedure_scope
+        self.table.enter()
 
         for child in node.children:
             self.visit(child)
 
-        self.current_scope = self.current_scope.enclosing_scope
+        self.table.exit()
 
     def visit_BinOp(self, node):
         """ left op right """
@@ -289,16 +379,18 @@ class SemanticAnalyzer(NodeVisitor):
                 self.error("Unsupported types at bitwise operator ltype:<{}> rtype:<{}> at line {}".format(
                     ltype.type,
                     rtype.type,
-                    node.line
+                    self.line(node)
                 ))
-        return ltype + rtype 
+        result = ltype + rtype
+        node.conversion = result.type if ltype.type != rtype.type else None
+        return self.typed(node, result)
 
     def visit_UnOp(self, node):
         """ op expr """
         if isinstance(node.op, Type):
             self.visit(node.expr)
-            return SemanticAnalyzer.CType(node.op.value)
-        return self.visit(node.expr)
+            return self.typed(node, self.ctype(node.op.value))
+        return self.typed(node, self.visit(node.expr))
 
     def visit_TerOp(self, node):
         """ condition ? texpression : fexpression """
@@ -309,9 +401,9 @@ class SemanticAnalyzer(NodeVisitor):
             self.warning("Incompatibile types at ternary operator texpr:<{}> fexpr:<{}> at line {}".format(
                 texpr,
                 fexpr,
-                node.line
+                self.line(node)
             ))
-        return texpr
+        return self.typed(node, texpr)
 
     def visit_Assign(self, node):
         """ right = left """
@@ -321,22 +413,25 @@ class SemanticAnalyzer(NodeVisitor):
             self.warning("Incompatible types when assigning to type <{}> from type <{}> at line {}".format(
                 left,
                 right,
-                node.line
+                self.line(node)
             ))
-        return right
+        node.conversion = left.type if left.type != right.type else None
+        return self.typed(node, right)
 
     def visit_Var(self, node):
         """ value """
         var_name = node.value
-        var_symbol = self.current_scope.lookup(var_name)
+        var_symbol, scope = self.table.resolve(var_name)
         if var_symbol is None:
             self.error(
                 "Symbol(identifier) not found '{}' at line {}".format(
                     var_name,
-                    node.line
+                    self.line(node)
                 )
             )
-        return SemanticAnalyzer.CType(var_symbol.type.name)
+        if isinstance(var_symbol, VarSymbol):
+            self.address(node, var_symbol, scope)
+        return self.typed(node, self.ctype(var_symbol.type.name))
 
     def __recurse_sub_struct(self, node):
         pass
@@ -344,12 +439,12 @@ class SemanticAnalyzer(NodeVisitor):
     def visit_StructVar(self, node):
         """ A struct var value"""
         var_name = node.struct_name
-        var_symbol = self.current_scope.lookup(var_name, struct=True)
+        var_symbol = self.table.lookup(var_name, struct=True)
         if var_symbol is None:
             self.error(
                 "Symbol(identifier) not found '{}' at line {}".format(
                     var_name,
-                    node.line
+                    self.line(node)
                 )
             )
         return self.visit(node.struct_variable)
@@ -388,11 +483,11 @@ class SemanticAnalyzer(NodeVisitor):
     def visit_Num(self, node):
         """ value """
         if node.token.type == INTEGER_CONST:
-            return SemanticAnalyzer.CType("int")
+            return self.typed(node, self.ctype("int"))
         elif node.token.type == CHAR_CONST:
-            return SemanticAnalyzer.CType("char")
+            return self.typed(node, self.ctype("char"))
         else:
-            return SemanticAnalyzer.CType("float")
+            return self.typed(node, self.ctype("float"))
 
     def visit_String(self, node):
         pass
@@ -402,26 +497,26 @@ class SemanticAnalyzer(NodeVisitor):
 
     def visit_FunctionCall(self, node):
         func_name = node.name
-        func_symbol = self.current_scope.lookup(func_name)
+        func_symbol = self.table.lookup(func_name)
         if func_symbol is None:
             self.error(
                 "Function '{}' not found at line {}".format(
                     func_name,
-                    node.line
+                    self.line(node)
                 ))
 
         if not isinstance(func_symbol, FunctionSymbol):
             self.error(
                 "Identifier '{}' cannot be used as a function at line".format(
                     func_name,
-                    node.line
+                    self.line(node)
                 )
             )
 
         if func_symbol.params == None:
             for i, arg in enumerate(node.args):
                 self.visit(arg)
-            return SemanticAnalyzer.CType(func_symbol.type.name)
+            return self.typed(node, self.ctype(func_symbol.type.name))
 
         if len(node.args) != len(func_symbol.params):
             self.error(
@@ -429,7 +524,7 @@ class SemanticAnalyzer(NodeVisitor):
                     func_name,
                     len(node.args),
                     len(func_symbol.params),
-                    node.line
+                    self.line(node)
                 )
             )
 
@@ -438,7 +533,7 @@ class SemanticAnalyzer(NodeVisitor):
 
         for i, arg in enumerate(node.args):
             arg_type = self.visit(arg)
-            param_type = SemanticAnalyzer.CType(func_symbol.params[i].type.name)
+            param_type = self.ctype(func_symbol.params[i].type.name)
             expected.append(param_type)
             found.append(arg_type)
 
@@ -448,10 +543,10 @@ class SemanticAnalyzer(NodeVisitor):
                 str(expected).replace('[', '(').replace(']', ')'),
                 func_name,
                 str(found).replace('[', '(').replace(']', ')'),
-                node.line
+                self.line(node)
             ))
 
-        return SemanticAnalyzer.CType(func_symbol.type.name)
+        return self.typed(node, self.ctype(func_symbol.type.name))
 
     def visit_Expression(self, node):
         expr = None
@@ -460,6 +555,7 @@ class SemanticAnalyzer(NodeVisitor):
         return expr
 
     @staticmethod
-    def analyze(tree):
-        semantic_analyzer = SemanticAnalyzer()
+    def analyze(tree, strict=True, history=False):
+        semantic_analyzer = SemanticAnalyzer(strict, history)
         semantic_analyzer.visit(tree)
+        return semantic_analyzer
@@ -16,6 +16,7 @@ class Symbol(object):
 class VarSymbol(Symbol):
     def __init__(self, name, type):
         super(VarSymbol, self).__init__(name, type)
+        self.slot = None
 
     def __str__(self):
         return "<{class_name}(name='{name}', type='{type}')>".format(
@@ -72,12 +73,82 @@ class FunctionSymbol(Symbol):
     __repr__ = __str__
 
 
-class ScopedSymbolTable(object):
-    def __init__(self, scope_name, scope_level, enclosing_scope=None):
-        self._symbols = OrderedDict()
+class Scope(object):
+    """ A scope of the SymbolTable. It holds no symbols itself, only where
+    its bindings start in the undo log and the slot of each of its variables;
+    when the table keeps its history, it also keeps its children and a copy
+    of its symbols once closed. """
+    __slots__ = ('scope_name', 'scope_level', 'enclosing_scope', 'mark', 'slots', 'symbols', 'children')
+
+    def __init__(self, scope_name, scope_level, enclosing_scope, mark):
         self.scope_name = scope_name
         self.scope_level = scope_level
         self.enclosing_scope = enclosing_scope
+        self.mark = mark
+        # slot of each variable name: 0, 1, ... in their order of declaration.
+        # A name declared again, once forgotten, keeps its slot.
+        self.slots = {}
+        self.symbols = None
+        self.children = None
+
+
+class Position(object):
+    """ Rank of a top level declaration in its program """
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+
+class SymbolTable(object):
+    """ Every open scope in one dict, from a name to the stack of its
+    bindings, innermost last, so a lookup costs the same at any depth. The
+    undo log lists the names bound, in order: leaving a scope pops the
+    bindings logged since it was entered.
+    A global binding belongs to the top level declaration at `position`
+    when it was inserted, anything with an index. While position is set,
+    only the globals of the declarations up to it are seen, as if the ones
+    after had not been analyzed yet, so a declaration analyzed late (a lazy
+    function body, a declaration edited) sees what it would see in order.
+    With history, closed scopes are kept as a tree for str(table). """
+
+    def __init__(self, history=False):
+        self._bindings = {}     # name -> [(symbol, scope, position), ...]
+        self.log = []
+        self.scope = None
+        self.position = None
+        self.history = history
+        self.root = None
+
+    def enter(self, scope_name=None):
+        """ Open a scope nested in the current one, blocks have no name """
+        enclosing = self.scope
+        self.scope = Scope(
+            scope_name,
+            enclosing.scope_level + 1 if enclosing else 1,
+            enclosing,
+            len(self.log)
+        )
+        if self.history:
+            self.scope.children = []
+            if enclosing is None:
+                self.root = self.scope
+            else:
+                enclosing.children.append(self.scope)
+        return self.scope
+
+    def exit(self):
+        """ Close the current scope, undoing its bindings """
+        scope = self.scope
+        if self.history:
+            scope.symbols = OrderedDict(self.symbols(scope))
+        for name in reversed(self.log[scope.mark:]):
+            bindings = self._bindings[name]
+            bindings.pop()
+            if not bindings:
+                del self._bindings[name]
+        del self.log[scope.mark:]
+        self.scope = scope.enclosing_scope
 
     def _init_builtins(self):
         self.insert(BuiltinTypeSymbol('char'))
@@ -86,44 +157,111 @@ class ScopedSymbolTable(object):
         self.insert(BuiltinTypeSymbol('double'))
         self.insert(BuiltinTypeSymbol('void'))
 
-    def __str__(self):
-        h1 = 'SCOPE (SCOPED SYMBOL TABLE)'
-        lines = ['\n', h1, '=' * len(h1)]
-        for header_name, header_value in (
-            ('Scope name', self.scope_name),
-            ('Scope level', self.scope_level),
-            ('Enclosing scope',
-             self.enclosing_scope.scope_name if self.enclosing_scope else None
-            )
-        ):
-            lines.append('%-15s: %s' % (header_name, header_value))
-        h2 = 'Scope (Scoped symbol table) contents'
-        lines.extend([h2, '-' * len(h2)])
-        lines.extend(
-            ('%7s: %r' % (key, value))
-            for key, value in self._symbols.items()
-        )
-        lines.append('\n')
-        s = '\n'.join(lines)
-        return s
-
-    __repr__ = __str__
-
     def insert(self, symbol):
         # print('Insert: %s' % symbol.name)
-        self._symbols[symbol.name] = symbol
+        scope = self.scope
+        if isinstance(symbol, VarSymbol):
+            symbol.slot = scope.slots.setdefault(symbol.name, len(scope.slots))
+        position = self.position if scope.enclosing_scope is None else None
+        bindings = self._bindings.setdefault(symbol.name, [])
+        index = self._own(bindings, scope, position)
+        if index is None:
+            bindings.append((symbol, scope, position))
+            self.log.append(symbol.name)
+        else:
+            bindings[index] = (symbol, scope, position)
 
-    def lookup(self, name, current_scope_only=False, struct=False):
-        #print('Lookup: %s. (Scope name: %s)' % (name, self.scope_name))
-        # 'symbol' is either an instance of the Symbol class or None
-        symbol = self._symbols.get(name)
+    @staticmethod
+    def _own(bindings, scope, position):
+        """ Index in bindings of the one of scope and position, if any """
+        for index in range(len(bindings) - 1, -1, -1):
+            if bindings[index][1] is scope and bindings[index][2] is position:
+                return index
+            if bindings[index][1].enclosing_scope is not None:
+                # local bindings only come above the ones of their scope
+                return None
+        return None
 
-        if symbol is not None:
-            return symbol
+    def forget(self, name):
+        """ Remove the binding of name in the current scope, at the current
+        position for the global scope; returns its symbol """
+        scope = self.scope
+        bindings = self._bindings.get(name)
+        index = None
+        if bindings:
+            index = self._own(bindings, scope, self.position if scope.enclosing_scope is None else None)
+        if index is None:
+            return None
+        symbol = bindings.pop(index)[0]
+        if not bindings:
+            del self._bindings[name]
+        del self.log[len(self.log) - 1 - self.log[::-1].index(name)]
+        return symbol
 
-        if current_scope_only:
+    def _binding(self, name):
+        """ The binding of name seen from the current scope and position """
+        bindings = self._bindings.get(name)
+        if not bindings:
             return None
+        binding = bindings[-1]
+        if binding[1].enclosing_scope is not None or len(bindings) == 1 and self._sees(binding[2]):
+            return binding
+        # global bindings of several declarations: the last one seen
+        found = None
+        for binding in bindings:
+            if binding[1].enclosing_scope is None and self._sees(binding[2]) and (
+                    found is None or found[2] is None or
+                    binding[2] is not None and binding[2].index > found[2].index):
+                found = binding
+        return found
+
+    def _sees(self, position):
+        return position is None or self.position is None or position.index <= self.position.index
 
-        # recursively go up the chain and lookup the name
-        if self.enclosing_scope is not None:
-            return self.enclosing_scope.lookup(name)
+    def resolve(self, name):
+        """ (symbol, scope which declares it) of name, (None, None) if it is not declared """
+        binding = self._binding(name)
+        if binding is None:
+            return None, None
+        return binding[0], binding[1]
+
+    def lookup(self, name, current_scope_only=False, struct=False):
+        binding = self._binding(name)
+        if binding is None:
+            return None
+        if current_scope_only and binding[1] is not self.scope:
+            return None
+        return binding[0]
+
+    def symbols(self, scope):
+        """ (name, symbol) bound in an open scope, in their order of declaration """
+        names = OrderedDict.fromkeys(self.log[scope.mark:])
+        for name in names:
+            for symbol, owner, _ in self._bindings[name]:
+                if owner is scope:
+                    yield name, symbol
+
+    def __str__(self):
+        """ The tree of the scopes when keeping history, else the open ones """
+        lines = []
+        if self.history and self.root is not None:
+            stack = [self.root]
+        else:
+            stack = []
+            scope = self.scope
+            while scope is not None:
+                stack.append(scope)
+                scope = scope.enclosing_scope
+        while stack:
+            scope = stack.pop()
+            indent = '    ' * (scope.scope_level - 1)
+            lines.append('{}{} (level {})'.format(
+                indent, scope.scope_name or 'block', scope.scope_level
+            ))
+            symbols = scope.symbols.items() if scope.symbols is not None else self.symbols(scope)
+            lines.extend('{}    {}: {!r}'.format(indent, name, symbol) for name, symbol in symbols)
+            if self.history:
+                stack.extend(reversed(scope.children))
+        return '\n'.join(lines)
+
+    __repr__ = __str__
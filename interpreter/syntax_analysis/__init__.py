@@ -14,3 +14,4 @@ than for others.
 """
 from . import tree
 from . import parser
+from . import arena
@@ -0,0 +1,264 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from array import array
+import pickle
+import struct
+from ..lexical_analysis.token import Token
+from ..lexical_analysis.token_type import ID
+from ..lexical_analysis.buffer import FIXED_TOKENS
+from ..lexical_analysis.lines import LineIndex
+from ..lexical_analysis.names import NameTable
+from . import tree
+from .tree import Node, Program
+
+# Every node class, its index in this tuple is its kind in the arena
+NODE_KINDS = tuple(sorted(
+    (cls for cls in vars(tree).values() if isinstance(cls, type) and issubclass(cls, Node)
+     and cls.__module__ == tree.__name__ and '__slots__' in cls.__dict__ and cls not in (Node, tree.Leaf, tree.LazyBody)),
+    key=lambda cls: cls.__name__
+))
+KIND_INDEX = {cls: kind for kind, cls in enumerate(NODE_KINDS)}
+
+# How a field is stored: a node is the index of the child (-1 for None),
+# a list of nodes the position of its length followed by its items in
+# `lists`, a token has its kind in `ops` and its value in the pool, and any
+# other value is an index in the pool.
+NODE, NODES, TOKEN, VALUE = range(4)
+FIELD_ENCODINGS = {
+    'children': NODES, 'struct_body': NODES, 'params': NODES, 'args': NODES,
+    'token': TOKEN, 'op': TOKEN,
+    'struct_name': VALUE, 'struct_type': VALUE, 'func_name': VALUE,
+    'library_name': VALUE, 'name': VALUE, 'prefix': VALUE, 'symbol': VALUE,
+    'depth': VALUE, 'slot': VALUE, 'ctype': VALUE, 'conversion': VALUE,
+}
+# the line index and the name table of a Program belong to the arena
+ARENA_FIELDS = ('offset', 'lines', 'names')
+
+# (name, encoding) of the fields of each kind, in storage order
+LAYOUTS = tuple(
+    tuple(
+        (name, FIELD_ENCODINGS.get(name, NODE))
+        for klass in reversed(cls.__mro__[:-1])
+        for name in klass.__dict__.get('__slots__', ())
+        if name not in ARENA_FIELDS
+    )
+    for cls in NODE_KINDS
+)
+
+MAGIC = b'SCIA'
+VERSION = 3
+HEADER = struct.Struct('<4sBxxx4I')
+
+
+class NodeArena(object):
+    """ A whole tree stored as parallel arrays instead of linked objects.
+    Node i has the class NODE_KINDS[kinds[i]] and starts at offsets[i] in the
+    source; its fields are operands[starts[i]:], laid out as LAYOUTS[kinds[i]]
+    describes, and ops[i] is the kind of its token, if it has one. The root
+    is node 0. A node shared by two parents is stored once. A LazyBody has
+    no kind: the function bodies of a tree must be loaded to store it.
+    The arrays may as well be memoryviews over a serialized arena, e.g. a
+    mmap of a cache file, which are then read in place. """
+
+    def __init__(self, tree=None):
+        self.kinds = array('B')
+        self.ops = array('B')
+        self.offsets = array('I')
+        self.starts = array('I')
+        self.operands = array('i')
+        self.lists = array('i')
+        self.constants = [None]
+        self.lines = None
+        self.names = None
+        self._constant_index = {}
+        if tree is not None:
+            self.build(tree)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def constant(self, value):
+        """ Index of value in the constant pool """
+        key = (type(value), value)
+        index = self._constant_index.get(key)
+        if index is None:
+            index = self._constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def build(self, root):
+        """ Append the nodes of the tree rooted at root, in preorder """
+        if isinstance(root, Program):
+            self.lines, self.names = root.lines, root.names
+        indexes = {}
+        # (node, array and position where its index goes)
+        stack = [(root, None, 0)]
+        while stack:
+            node, target, slot = stack.pop()
+            if node is None:
+                index = -1
+            elif id(node) in indexes:
+                index = indexes[id(node)]
+            else:
+                index = indexes[id(node)] = self.append(node, stack)
+            if target is not None:
+                target[slot] = index
+        return self
+
+    def append(self, node, stack):
+        """ Store node, leaving the indexes of its children to be filled
+        in once they are stored: they are pushed on stack """
+        index = len(self.kinds)
+        kind = KIND_INDEX[type(node)]
+        self.kinds.append(kind)
+        self.offsets.append(node.offset)
+        self.starts.append(len(self.operands))
+        op = 0
+        children = []
+        for name, encoding in LAYOUTS[kind]:
+            value = getattr(node, name)
+            if encoding == NODE:
+                children.append((value, self.operands, len(self.operands)))
+                self.operands.append(-1)
+            elif encoding == NODES:
+                self.operands.append(len(self.lists))
+                self.lists.append(len(value))
+                for child in value:
+                    children.append((child, self.lists, len(self.lists)))
+                    self.lists.append(-1)
+            elif encoding == TOKEN:
+                op = value.type
+                self.operands.append(self.constant(value.value))
+            else:
+                self.operands.append(self.constant(value))
+        self.ops.append(op)
+        stack.extend(reversed(children))
+        return index
+
+    def kind(self, index):
+        """ Class of node index """
+        return NODE_KINDS[self.kinds[index]]
+
+    def field(self, index, name):
+        """ Field of node index: a child index (-1 for None), a list of child
+        indexes, a token or a plain value """
+        kind = self.kinds[index]
+        for position, (field, encoding) in enumerate(LAYOUTS[kind]):
+            if field == name:
+                return self.decode(index, encoding, self.operands[self.starts[index] + position])
+        raise AttributeError('{} has no field {}'.format(NODE_KINDS[kind].__name__, name))
+
+    def decode(self, index, encoding, operand):
+        if encoding == NODE:
+            return operand
+        if encoding == NODES:
+            return list(self.lists[operand + 1:operand + 1 + self.lists[operand]])
+        if encoding == TOKEN:
+            return self.token(self.ops[index], self.constants[operand])
+        return self.constants[operand]
+
+    def token(self, kind, value):
+        if kind in FIXED_TOKENS:
+            return FIXED_TOKENS[kind]
+        if kind == ID and self.names is not None:
+            return self.names.token(value)
+        return Token(kind, value)
+
+    def children(self, index):
+        """ Indexes of the children of node index, in field order """
+        result = []
+        start = self.starts[index]
+        for position, (_, encoding) in enumerate(LAYOUTS[self.kinds[index]]):
+            operand = self.operands[start + position]
+            if encoding == NODE:
+                if operand >= 0:
+                    result.append(operand)
+            elif encoding == NODES:
+                result.extend(self.lists[operand + 1:operand + 1 + self.lists[operand]])
+        return result
+
+    def walk(self, index=0):
+        """ Indexes of the nodes under index, itself included, in preorder;
+        a shared node comes once under each of its parents """
+        stack = [index]
+        while stack:
+            index = stack.pop()
+            yield index
+            stack.extend(reversed(self.children(index)))
+
+    def tree(self):
+        """ The tree of linked nodes back from the arena """
+        nodes = [NODE_KINDS[kind].__new__(NODE_KINDS[kind]) for kind in self.kinds]
+        for index, node in enumerate(nodes):
+            node.offset = self.offsets[index]
+            start = self.starts[index]
+            for position, (name, encoding) in enumerate(LAYOUTS[self.kinds[index]]):
+                value = self.decode(index, encoding, self.operands[start + position])
+                if encoding == NODE:
+                    value = nodes[value] if value >= 0 else None
+                elif encoding == NODES:
+                    value = [nodes[child] for child in value]
+                setattr(node, name, value)
+            if isinstance(node, Program):
+                node.lines, node.names = self.lines, self.names
+        return nodes[0] if nodes else None
+
+    def to_bytes(self):
+        """ Serialized arena: a header, the arrays, 4 bytes aligned, then
+        the constant pool, the names and the line starts, pickled """
+        extra = pickle.dumps((
+            self.constants,
+            self.names.names if self.names is not None else None,
+            self.lines.starts if self.lines is not None else None,
+        ))
+        parts = [HEADER.pack(
+            MAGIC, VERSION, len(self.kinds), len(self.operands), len(self.lists), len(extra)
+        )]
+        for values in (self.kinds, self.ops, self.offsets, self.starts, self.operands, self.lists):
+            data = bytes(memoryview(values).cast('B'))
+            parts.append(data + bytes(-len(data) % 4))
+        parts.append(extra)
+        return b''.join(parts)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        """ Arena over a serialized one, e.g. a mmap. The arrays are
+        memoryviews of buffer, only the constant pool is unpickled. """
+        view = memoryview(buffer)
+        magic, version, count, operands, lists, extra = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a node arena')
+        arena = cls()
+        position = HEADER.size
+        for name, code, length in (
+                ('kinds', 'B', count), ('ops', 'B', count), ('offsets', 'I', count),
+                ('starts', 'I', count), ('operands', 'i', operands), ('lists', 'i', lists)):
+            size = length * array(code).itemsize
+            setattr(arena, name, view[position:position + size].cast(code))
+            position += size + (-size % 4)
+        constants, names, starts = pickle.loads(view[position:position + extra])
+        arena.constants = constants
+        if names is not None:
+            arena.names = NameTable()
+            for name in names:
+                arena.names.token(name)
+        if starts is not None:
+            arena.lines = LineIndex(None)
+            arena.lines._starts = starts
+        return arena
+
+
+class ArenaVisitor(object):
+    """ NodeVisitor counterpart walking a NodeArena by index:
+    visit(index) calls visit_<node class name>(index) """
+
+    def __init__(self, arena):
+        self.arena = arena
+
+    def visit(self, index):
+        method_name = 'visit_' + self.arena.kind(index).__name__
+        visitor = getattr(self, method_name, self.generic_visit)
+        return visitor(index)
+
+    def generic_visit(self, index):
+        raise Exception('No visit_{} method'.format(self.arena.kind(index).__name__))
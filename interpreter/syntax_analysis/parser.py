@@ -2,21 +2,67 @@
 """ SCI - Simple C Interpreter """
 
 from ..lexical_analysis.token_type import *
+from ..lexical_analysis.buffer import TokenBuffer
 from .tree import *
-from ..utils.utils import restorable
 
 class SyntaxError(Exception):
     pass
 
+# Binary operators from the loosest to the tightest binding, as in C;
+# all of them are left associative.
+BINARY_OPERATORS = (
+    (LOG_OR_OP,),
+    (LOG_AND_OP,),
+    (OR_OP,),
+    (XOR_OP,),
+    (AND_OP,),
+    (EQ_OP, NE_OP),
+    (LE_OP, LT_OP, GE_OP, GT_OP),
+    (LEFT_OP, RIGHT_OP),
+    (ADD_OP, SUB_OP),
+    (MUL_OP, DIV_OP, MOD_OP),
+)
+BINARY_PRECEDENCE = {
+    op: level for level, ops in enumerate(BINARY_OPERATORS, 1) for op in ops
+}
+
 
 class Parser(object):
-    def __init__(self, lexer):
-        self.lexer = lexer
-        self.current_token = self.lexer.get_next_token  # set current token to the first token taken from the input
+    def __init__(self, lexer, lazy=False):
+        # the whole input is tokenized once, the parser then moves a cursor over the buffer
+        self.tokens = lexer if isinstance(lexer, TokenBuffer) else TokenBuffer(lexer)
+        # a lazy parser only skips over function bodies, they are parsed on first call
+        self.lazy = lazy
+        self.pos = 0
+        self.current_token = self.tokens.token(self.pos)
+
+    @property
+    def offset(self):
+        """ Offset of the first char of the current token """
+        return self.tokens.offsets[self.pos]
+
+    def position(self):
+        """ (line, char) of the current token, for error messages """
+        return self.tokens.position(self.pos)
 
     def error(self, message):
         raise SyntaxError(message)
 
+    def peek_token(self, k=1):
+        """ Token k positions after the current one, the parser does not move.
+        peek_token(0) is the current token, tokens past the end read as EOF """
+        return self.tokens.token(self.pos + k)
+
+    def mark(self):
+        """ Checkpoint to come back to after a speculative parse:
+        the whole state of the parser is the position in the buffer """
+        return self.pos
+
+    def reset(self, mark):
+        """ Go back to a checkpoint taken with mark() """
+        self.pos = mark
+        self.current_token = self.tokens.token(mark)
+
     def eat(self, token_type):
         """ Compare the current token type with the passed token
         type and if they match then "eat" the current token
@@ -24,11 +70,14 @@ class Parser(object):
         otherwise raise an exception. """
 
         if self.current_token.type == token_type:
-            self.current_token = self.lexer.get_next_token
+            # EOF is the last token of the buffer and the only one never left
+            if token_type != EOF:
+                self.pos += 1
+                self.current_token = self.tokens.token(self.pos)
         else:
             self.error(
                 'Expected token <{}> but found <{}> at line {}:{}.'.format(
-                    token_type, self.current_token.type, self.lexer.line, self.lexer.char
+                    TOKEN_NAMES[token_type], self.current_token.name, *self.position()
                 )
             )
 
@@ -38,39 +87,51 @@ class Parser(object):
         """
         root = Program(
             declarations=self.declarations(),
-            line=self.lexer.line,
-            char=self.lexer.line
+            offset=0,
+            lines=self.tokens.lines,
+            names=self.tokens.names
         )
         return root
 
     def declarations(self):
         """
-        declarations                : (include_library | struct_type | function_declaration | declaration_list)*
+        declarations                : external_declaration*
         """
         declarations = []
 
-        while self.current_token.type in [CHAR, FLOAT, DOUBLE, INT, HASH, VOID,
-                                          STRUCT]:
-            if self.current_token.type == HASH:
-                declarations.append(self.include_library())
-            elif self.current_token.type == STRUCT:
-                declarations.append(self.struct_type())
-            elif self.check_function():
-                declarations.append(self.function_declaration())
-            else:
-                declarations.extend(self.declaration_list())
+        while self.check_external_declaration():
+            declarations.extend(self.external_declaration())
         return declarations
 
+    def check_external_declaration(self):
+        return self.current_token.type in (CHAR, FLOAT, DOUBLE, INT, HASH, VOID, STRUCT)
+
+    def external_declaration(self):
+        """
+        external_declaration        : include_library | struct_type | function_declaration | declaration_list
+
+        Returns the list of nodes declared, a declaration_list may declare several.
+        """
+        if self.current_token.type == HASH:
+            return [self.include_library()]
+        elif self.current_token.type == STRUCT:
+            return [self.struct_type()]
+        elif self.check_function():
+            return [self.function_declaration()]
+        else:
+            return self.declaration_list()
+
     def include_library(self):
         """
         include_library             : HASH ID<'include'> LESS_THAN ID DOT ID<'h'> GREATER_THAN
         """
+        offset = self.offset
         self.eat(HASH)
         token = self.current_token
         if token.value != 'include':
             self.error(
                 'Expected token "include" but found {} at line {}:{}.'.format(
-                    token.value, self.lexer.line, self.lexer.char
+                    token.value, *self.position()
                 )
             )
 
@@ -83,26 +144,24 @@ class Parser(object):
         if extension.value != 'h':
             self.error(
                 'You can include only *.h files [line {}:{}]'.format(
-                    self.lexer.line, self.lexer.char
+                    *self.position()
                 )
             )
         self.eat(ID)
         self.eat(GT_OP)
         return IncludeLibrary(
             library_name=token.value,
-            line=self.lexer.line,
-            char=self.lexer.char
+            offset=offset
         )
 
     def struct_type(self):
         """
         struct_type          : STRUCT ID LBRACKET struct_body RBRACKET SEMICOLON
         """
+        offset = self.offset
         self.eat(STRUCT)
         struct_name = self.current_token.value
         token = self.current_token
-        line=self.lexer.line
-        char=self.lexer.char
         self.eat(ID)
         self.eat(LBRACKET)
         body = self.struct_body()
@@ -111,8 +170,7 @@ class Parser(object):
             token=token,
             struct_name=struct_name,
             struct_body=body,
-            line=line,
-            char=char
+            offset=offset
         )
 
     def struct_body(self):
@@ -126,18 +184,14 @@ class Parser(object):
         self.eat(RBRACKET)
         return result
 
-    @restorable
     def check_function(self):
-        self.eat(self.current_token.type)
-        self.eat(ID)
-        return self.current_token.type == LPAREN
+        return self.peek_token(1).type == ID and self.peek_token(2).type == LPAREN
 
     def function_declaration(self):
         """
         function_declaration        : type_spec ID LPAREN parameters RPAREN compound_statement
         """
-        line=self.lexer.line
-        char=0
+        offset = self.offset
         type_node = self.type_spec()
         func_name = self.current_token.value
         self.eat(ID)
@@ -148,18 +202,53 @@ class Parser(object):
             type_node=type_node,
             func_name=func_name,
             params=params,
-            body=self.function_body(),
-            line=line,
-            char=char
+            body=self.lazy_body() if self.lazy else self.function_body(),
+            offset=offset
         )
 
+    def lazy_body(self):
+        """ Skip a function body, up to its matching RBRACKET, without
+        parsing it: function_body_at parses it when it is first needed """
+        offset = self.offset
+        start = self.pos
+        self.eat(LBRACKET)
+        kinds = self.tokens.kinds
+        depth = 1
+        pos = self.pos
+        while depth and kinds[pos] != EOF:
+            if kinds[pos] == LBRACKET:
+                depth += 1
+            elif kinds[pos] == RBRACKET:
+                depth -= 1
+            pos += 1
+        if depth:
+            # unbalanced, report the missing RBRACKET at EOF
+            self.reset(pos)
+            self.eat(RBRACKET)
+        self.reset(pos)
+        return LazyBody(
+            start=start,
+            stop=pos,
+            parse=self.function_body_at,
+            offset=offset
+        )
+
+    def function_body_at(self, start):
+        """ Parse the function body starting at token start, the parser
+        then goes back to where it was """
+        mark = self.mark()
+        self.reset(start)
+        try:
+            return self.function_body()
+        finally:
+            self.reset(mark)
+
     def function_body(self):
         """
         function_body               : LBRACKET (declaration_list | statement)* RBRACKET
         """
         result = []
-        line=self.lexer.line
-        char=self.lexer.char
+        offset = self.offset
         self.eat(LBRACKET)
         while self.current_token.type != RBRACKET:
             if self.current_token.type in (CHAR, INT, FLOAT, DOUBLE):
@@ -169,8 +258,7 @@ class Parser(object):
         self.eat(RBRACKET)
         return FunctionBody(
             children=result,
-            line=line,
-            char=char
+            offset=offset
         )
 
     def parameters(self):
@@ -180,18 +268,16 @@ class Parser(object):
         nodes = []
         if self.current_token.type != RPAREN:
             nodes = [Param(
+                offset=self.offset,
                 type_node=self.type_spec(),
-                var_node=self.variable(),
-                line=self.lexer.line,
-                char=self.lexer.char
+                var_node=self.variable()
             )]
             while self.current_token.type == COMMA:
                 self.eat(COMMA)
                 nodes.append(Param(
+                    offset=self.offset,
                     type_node=self.type_spec(),
-                    var_node=self.variable(),
-                    line=self.lexer.line,
-                    char=self.lexer.char
+                    var_node=self.variable()
                 ))
         return nodes
 
@@ -225,8 +311,7 @@ class Parser(object):
                 result.append(VarDecl(
                     type_node=type_node,
                     var_node=node,
-                    line=node.line,
-                    char=node.char
+                    offset=node.offset
                 ))
             else:
                 result.append(node)
@@ -239,11 +324,11 @@ class Parser(object):
         """
         token = self.current_token
         if token.type in (CHAR, INT, FLOAT, DOUBLE, VOID):
+            offset = self.offset
             self.eat(token.type)
             return Type(
                 token=token,
-                line=self.lexer.line,
-                char=self.lexer.char
+                offset=offset
             )
 
     def struct_decl(self):
@@ -262,8 +347,7 @@ class Parser(object):
                         token=token,
                         struct_name=node.value,
                         struct_type=token.value,
-                        line=node.line,
-                        char=node.char
+                        offset=node.offset
                     )
                 )
             else:
@@ -287,8 +371,7 @@ class Parser(object):
         """
         init_declarator             : variable (ASSIGN assignment_expression)?
         """
-        line = self.lexer.line
-        char = self.lexer.char
+        offset = self.offset
         var = self.variable()
         result = list()
         result.append(var)
@@ -299,8 +382,7 @@ class Parser(object):
                 left=var,
                 op=token,
                 right=self.assignment_expression(),
-                line=line,
-                char=char
+                offset=offset
             ))
         return result
 
@@ -322,7 +404,6 @@ class Parser(object):
             return self.compound_statement()
         return self.expression_statement()
 
-    @restorable
     def check_compound_statement(self):
         return self.current_token.type == LBRACKET
 
@@ -331,6 +412,7 @@ class Parser(object):
         compound_statement          : LBRACKET (declaration_list | statement)* RBRACKET
         """
         result = []
+        offset = self.offset
         self.eat(LBRACKET)
         while self.current_token.type != RBRACKET:
             if self.current_token.type in (CHAR, INT, FLOAT, DOUBLE):
@@ -340,11 +422,9 @@ class Parser(object):
         self.eat(RBRACKET)
         return CompoundStmt(
             children=result,
-            line=self.lexer.line,
-            char=self.lexer.char
+            offset=offset
         )
 
-    @restorable
     def check_jump_statement(self):
         return self.current_token.type in (RETURN, BREAK, CONTINUE)
 
@@ -354,6 +434,7 @@ class Parser(object):
                                     | BREAK SEMICOLON
                                     | CONTINUE SEMICOLON
         """
+        offset = self.offset
         if self.current_token.type == RETURN:
             self.eat(RETURN)
             expression = self.empty()
@@ -362,26 +443,22 @@ class Parser(object):
             self.eat(SEMICOLON)
             return ReturnStmt(
                 expression=expression,
-                line=self.lexer.line,
-                char=self.lexer.char
+                offset=offset
             )
         elif self.current_token.type == BREAK:
             self.eat(BREAK)
             self.eat(SEMICOLON)
             return BreakStmt(
-                line=self.lexer.line,
-                char=self.lexer.char
+                offset=offset
             )
 
         elif self.current_token.type == CONTINUE:
             self.eat(CONTINUE)
             self.eat(SEMICOLON)
             return ContinueStmt(
-                line=self.lexer.line,
-                char=self.lexer.char
+                offset=offset
             )
 
-    @restorable
     def check_selection_statement(self):
         return self.current_token.type == IF
 
@@ -390,6 +467,7 @@ class Parser(object):
         selection_statement         : IF LPAREN expression RPAREN statement (ELSE statement)?
         """
         if self.current_token.type == IF:
+            offset = self.offset
             self.eat(IF)
             self.eat(LPAREN)
             condition = self.expression()
@@ -403,11 +481,9 @@ class Parser(object):
                 condition=condition,
                 tbody=tstatement,
                 fbody=fstatement,
-                line=self.lexer.line,
-                char=self.lexer.char
+                offset=offset
             )
 
-    @restorable
     def check_iteration_statement(self):
         return self.current_token.type in (WHILE, DO, FOR)
 
@@ -417,9 +493,8 @@ class Parser(object):
                                     | DO statement WHILE LPAREN expression RPAREN SEMICOLON
                                     | FOR LPAREN expression_statement expression_statement (expression)? RPAREN statement
         """
+        offset = self.offset
         if self.current_token.type == WHILE:
-            line=self.lexer.line
-            char=self.lexer.char - 4
             self.eat(WHILE)
             self.eat(LPAREN)
             expression = self.expression()
@@ -428,8 +503,7 @@ class Parser(object):
             return WhileStmt(
                 condition=expression,
                 body=statement,
-                line=line,
-                char=char
+                offset=offset
             )
         elif self.current_token.type == DO:
             self.eat(DO)
@@ -442,14 +516,14 @@ class Parser(object):
             return DoWhileStmt(
                 condition=expression,
                 body=statement,
-                line=self.lexer.line
+                offset=offset
             )
         else:
             self.eat(FOR)
             self.eat(LPAREN)
             setup = self.expression_statement()
             condition = self.expression_statement()
-            increment = NoOp(line=self.lexer.line)
+            increment = NoOp(offset=self.offset)
             if self.current_token.type != RPAREN:
                 increment = self.expression()
             self.eat(RPAREN)
@@ -459,8 +533,7 @@ class Parser(object):
                 condition=condition,
                 increment=increment,
                 body=statement,
-                line=self.lexer.line,
-                char=self.lexer.char
+                offset=offset
             )
 
     def expression_statement(self):
@@ -468,10 +541,11 @@ class Parser(object):
         expression_statement        : expression* SEMICOLON
         """
         node = None
+        offset = self.offset
         if self.current_token.type != SEMICOLON:
             node = self.expression()
         self.eat(SEMICOLON)
-        return node and node or NoOp(line=self.lexer.line)
+        return node and node or NoOp(offset=offset)
 
     def constant_expression(self):
         """
@@ -484,31 +558,28 @@ class Parser(object):
         expression                  : assignment_expression (COMMA assignment_expression)*
         """
         result = list()
-        line=self.lexer.line
-        char=self.lexer.char
+        offset = self.offset
         result.append(self.assignment_expression())
         while self.current_token.type == COMMA:
             self.eat(COMMA)
             result.append(self.assignment_expression())
         return Expression(
             children=result,
-            line=line,
-            char=char
+            offset=offset
         )
 
-    @restorable
-    def is_struct(self):
-        if self.current_token.type == DOT:
-            self.eat(DOT)
-            return self.check_assignment_expression()
-        return False
+    def is_struct(self, k=0):
+        """ Whether the tokens from k on are a struct member access: (DOT ID)+ """
+        return self.peek_token(k).type == DOT and self.peek_token(k + 1).type == ID
 
-    @restorable
     def check_assignment_expression(self):
-        if self.current_token.type == ID:
-            self.eat(ID)
-            return (self.is_struct() or self.current_token.type.endswith('ASSIGN'))
-        return False
+        """ Whether the tokens ahead are ID (DOT ID)* followed by an assignment operator """
+        if self.current_token.type != ID:
+            return False
+        k = 1
+        while self.is_struct(k):
+            k += 2
+        return self.peek_token(k).type in ASSIGNMENT_OPS
 
     def assignment_expression(self):
         """
@@ -517,27 +588,24 @@ class Parser(object):
         """
         if self.check_assignment_expression():
             node = self.variable()
-            while self.current_token.type.endswith('ASSIGN'):
-                line=self.lexer.line
-                char=self.lexer.char - len(self.current_token.value) + 1
+            while self.current_token.type in ASSIGNMENT_OPS:
+                offset = self.offset
                 token = self.current_token
                 self.eat(token.type)
             return Assign(
                 left=node,
                 op=token,
                 right=self.assignment_expression(),
-                line=line,
-                char=char
+                offset=offset
             )
         return self.conditional_expression()
 
     def conditional_expression(self):
         """
-        conditional_expression      : logical_and_expression (QUESTION_MARK expression COLON conditional_expression)?
+        conditional_expression      : binary_expression (QUESTION_MARK expression COLON conditional_expression)?
         """
-        node = self.logical_and_expression()
-        line=self.lexer.line
-        char=self.lexer.char
+        node = self.binary_expression()
+        offset = self.offset
         if self.current_token.type == QUESTION_MARK:
             self.eat(QUESTION_MARK)
             texpression = self.expression()
@@ -547,219 +615,45 @@ class Parser(object):
                 condition=node,
                 texpression=texpression,
                 fexpression=fexpression,
-                line=self.lexer.line,
-                char=self.lexer.char
-            )
-        return node
-
-    def logical_and_expression(self):
-        """
-        logical_and_expression      : logical_or_expression (LOG_AND_OP logical_or_expression)*
-        """
-        node = self.logical_or_expression()
-        line=self.lexer.line
-        char=self.lexer.char
-        while self.current_token.type == LOG_AND_OP:
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                op=token,
-                right=self.logical_or_expression(),
-                line=line,
-                char=char
-            )
-        return node
-
-    def logical_or_expression(self):
-        """
-        logical_or_expression       : inclusive_or_expression (LOG_OR_OP inclusive_or_expression)*
-        """
-        node = self.inclusive_or_expression()
-        line=self.lexer.line
-        char=self.lexer.char
-        while self.current_token.type == LOG_OR_OP:
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                op=token,
-                right=self.inclusive_or_expression(),
-                line=line,
-                char=char
-            )
-        return node
-
-    def inclusive_or_expression(self):
-        """
-        inclusive_or_expression     : exclusive_or_expression (OR_OP exclusive_or_expression)*
-        """
-        node = self.exclusive_or_expression()
-        line=self.lexer.line
-        char=self.lexer.char
-        while self.current_token.type == OR_OP:
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                op=token,
-                right=self.exclusive_or_expression(),
-                line=line,
-                char=char
-            )
-        return node
-
-    def exclusive_or_expression(self):
-        """
-        exclusive_or_expression     : and_expression (XOR_OP and_expression)*
-        """
-        node = self.and_expression()
-        line=self.lexer.line
-        char=self.lexer.char
-        while self.current_token.type == XOR_OP:
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                op=token,
-                right=self.and_expression(),
-                line=line,
-                char=char
-            )
-        return node
-
-    def and_expression(self):
-        """
-        and_expression              : equality_expression (AND_OP equality_expression)*
-        """
-        node = self.equality_expression()
-        line=self.lexer.line
-        char=self.lexer.char
-        while self.current_token.type == AND_OP:
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                op=token,
-                right=self.equality_expression(),
-                line=line,
-                char=char
-            )
-        return node
-
-    def equality_expression(self):
-        """
-        equality_expression         : relational_expression ((EQ_OP | NE_OP) relational_expression)*
-        """
-        node = self.relational_expression()
-        line=self.lexer.line
-        char=self.lexer.char
-        while self.current_token.type in (EQ_OP, NE_OP):
-            token = self.current_token
-            self.eat(token.type)
-            return BinOp(
-                left=node,
-                op=token,
-                right=self.relational_expression(),
-                line=line,
-                char=char
-            )
-        return node
-
-    def relational_expression(self):
-        """
-        relational_expression       : shift_expression ((LE_OP | LT_OP | GE_OP | GT_OP) shift_expression)*
-        """
-        node = self.shift_expression()
-        line=self.lexer.line
-        char=self.lexer.char - len(self.current_token.value) + 1
-        while self.current_token.type in (LE_OP, LT_OP, GE_OP, GT_OP):
-            token = self.current_token
-            self.eat(token.type)
-            return BinOp(
-                left=node,
-                op=token,
-                right=self.shift_expression(),
-                line=line,
-                char=char
-            )
-        return node
-
-    def shift_expression(self):
-        """
-        shift_expression            : additive_expression ((LEFT_OP | RIGHT_OP) additive_expression)*
-        """
-        node = self.additive_expression()
-        line=self.lexer.line
-        char=self.lexer.char
-        while self.current_token.type in (LEFT_OP, RIGHT_OP):
-            token = self.current_token
-            self.eat(token.type)
-            return BinOp(
-                left=node,
-                op=token,
-                right=self.additive_expression(),
-                line=line,
-                char=char
-            )
-        return node
-
-    def additive_expression(self):
-        """
-        additive_expression         : multiplicative_expression ((ADD_OP | SUB_OP) multiplicative_expression)*
-        """
-        node = self.multiplicative_expression()
-
-        while self.current_token.type in (ADD_OP, SUB_OP):
-            line=self.lexer.line
-            char=self.lexer.char
-            token = self.current_token
-            self.eat(token.type)
-            node = BinOp(
-                left=node,
-                op=token,
-                right=self.multiplicative_expression(),
-                line=line,
-                char=char
+                offset=offset
             )
-
         return node
 
-    def multiplicative_expression(self):
+    def binary_expression(self, precedence=1):
         """
-        multiplicative_expression   : cast_expression ((MUL_OP | DIV_OP | MOD_OP) cast_expression)*
+        binary_expression           : cast_expression (binary_operator cast_expression)*
+        Precedence climbing on BINARY_PRECEDENCE: a single loop covers every
+        level, and only an operator binding tighter than the current one
+        makes the parser recurse for its right operand.
         """
         node = self.cast_expression()
-        while self.current_token.type in (MUL_OP, DIV_OP, MOD_OP):
-            line=self.lexer.line
-            char=self.lexer.char
+        while True:
+            level = BINARY_PRECEDENCE.get(self.current_token.type)
+            if level is None or level < precedence:
+                return node
             token = self.current_token
+            offset = self.offset
             self.eat(token.type)
             node = BinOp(
                 left=node,
                 op=token,
-                right=self.cast_expression(),
-                line=line,
-                char=char
+                right=self.binary_expression(level + 1),
+                offset=offset
             )
-        return node
 
-    @restorable
     def check_cast_expression(self):
-        if self.current_token.type == LPAREN:
-            self.eat(LPAREN)
-            if self.current_token.type in [CHAR, DOUBLE, INT, FLOAT]:
-                self.eat(self.current_token.type)
-                return self.current_token.type == RPAREN
-        return False
+        return (
+            self.current_token.type == LPAREN
+            and self.peek_token(1).type in (CHAR, DOUBLE, INT, FLOAT)
+            and self.peek_token(2).type == RPAREN
+        )
 
     def cast_expression(self):
         """
         multiplicative_expression   : LPAREN type_spec RPAREN cast_expression
                                     | unary_expression
         """
-        line=self.lexer.line
-        char=self.lexer.char
+        offset = self.offset
         if self.check_cast_expression():
             self.eat(LPAREN)
             type_node = self.type_spec()
@@ -767,6 +661,7 @@ class Parser(object):
             return UnOp(
                 op=type_node.token,
                 expr=self.cast_expression(),
+                offset=offset
             )
         else:
             return self.unary_expression()
@@ -783,25 +678,21 @@ class Parser(object):
         """
         if self.current_token.type in (INC_OP, DEC_OP):
             token = self.current_token
-            line=self.lexer.line
-            char=self.lexer.char - len(self.current_token.value) + 1
+            offset = self.offset
             self.eat(token.type)
             return UnOp(
                 op=token,
                 expr=self.unary_expression(),
-                line=line,
-                char=char
+                offset=offset
             )
         elif self.current_token.type in (AND_OP, ADD_OP, SUB_OP, LOG_NEG):
             token = self.current_token
-            line=self.lexer.line
-            char=self.lexer.char
+            offset = self.offset
             self.eat(token.type)
             return UnOp(
                 op=token,
                 expr=self.cast_expression(),
-                line=line,
-                char=char
+                offset=offset
             )
         else:
             return self.postfix_expression()
@@ -813,16 +704,14 @@ class Parser(object):
                                     | primary_expression LPAREN argument_expression_list? RPAREN
         """
         node = self.primary_expression()
-        line = self.lexer.line
-        char = self.lexer.char - 1
+        offset = self.offset
         if self.current_token.type in (INC_OP, DEC_OP):
             token = self.current_token
             self.eat(token.type)
             node = UnOp(
                 op=token,
                 expr=node,
-                line=line,
-                char=char,
+                offset=offset,
                 prefix=False
             )
         elif self.current_token.type == LPAREN:
@@ -836,8 +725,8 @@ class Parser(object):
             node = FunctionCall(
                 name=node.value,
                 args=args,
-                line=self.lexer.line,
-                char=self.lexer.char
+                offset=node.offset,
+                symbol=node.symbol
             )
         return node
 
@@ -878,35 +767,30 @@ class Parser(object):
                                     | CHAR_CONST
         """
         token = self.current_token
-        line = self.lexer.line
-        char = self.lexer.char
+        offset = self.offset
         if token.type == CHAR_CONST:
             self.eat(CHAR_CONST)
             return Num(
                 token=token,
-                line=line,
-                char=char
+                offset=offset
             )
         elif token.type == INTEGER_CONST:
             self.eat(INTEGER_CONST)
             return Num(
                 token=token,
-                line=line,
-                char=char
+                offset=offset
             )
         elif token.type == REAL_CONST:
             self.eat(REAL_CONST)
             return Num(
                 token=token,
-                line=line,
-                char=char
+                offset=offset
             )
 
 
     def __parse_sub_struct(self):
         _token = self.current_token
-        line = self.lexer.line,
-        char = self.lexer.char
+        offset = self.offset
         self.eat(ID)
         __token = self.current_token
         if __token.type == DOT:
@@ -915,8 +799,7 @@ class Parser(object):
         else:
             _variable = Var(
                 token=_token,
-                line=line,
-                char=char
+                offset=offset
             )
             return _variable
 
@@ -925,39 +808,30 @@ class Parser(object):
         variable                    : ID (DOT ID)*
         """
         token = self.current_token
-        line=self.lexer.line
-        char=self.lexer.char - len(self.current_token.value) +1
+        offset = self.offset
         self.eat(ID)
         if self.current_token.type == DOT:
-            line=self.lexer.line
-            char=self.lexer.char+1
             self.eat(DOT)
             var = self.__parse_sub_struct()
             node = StructVar(
                 token=token,
                 struct_name=token.value,
                 struct_variable=var,
-                line=line,
-                char=char
+                offset=offset
             )
         else:
             node = Var(
                 token=token,
-                line=line,
-                char=char
+                offset=offset
             )
 
-        name = node.__dict__.get("struct_name", None)
-        if not name:
-            name = node.token
         return node
 
 
     def empty(self):
         """An empty production"""
         return NoOp(
-            line=self.lexer.line,
-            char=self.lexer.line,
+            offset=self.offset
         )
 
     def string(self):
@@ -965,18 +839,20 @@ class Parser(object):
         string                      : STRING
         """
         token = self.current_token
+        offset = self.offset
         self.eat(STRING)
         return String(
             token=token,
-            line=self.lexer.line,
-            char=self.lexer.char
+            offset=offset
         )
 
     def parse(self):
         """
         program                     : declarations
 
-        declarations                : (include_library | struct_type | function_declaration | declaration_list)*
+        declarations                : external_declaration*
+
+        external_declaration        : include_library | struct_type | function_declaration | declaration_list
 
         include_library             : HASH ID<'include'> LESS_THAN ID DOT ID<'h'> GREATER_THAN
 
@@ -1029,27 +905,21 @@ class Parser(object):
         assignment_expression       : assignment_expression (COMMA assignment_expression)*
                                     | conditional_expression
 
-        conditional_expression      : logical_and_expression (QUESTION_MARK expression COLON conditional_expression)?
-
-        logical_and_expression      : logical_or_expression (LOG_AND_OP logical_or_expression)*
-
-        logical_or_expression       : inclusive_or_expression (LOG_OR_OP inclusive_or_expression)*
+        conditional_expression      : binary_expression (QUESTION_MARK expression COLON conditional_expression)?
 
-        inclusive_or_expression     : exclusive_or_expression (OR_OP exclusive_or_expression)*
+        binary_expression           : cast_expression (binary_operator cast_expression)*
 
-        exclusive_or_expression     : and_expression (XOR_OP and_expression)*
-
-        and_expression              : equality_expression (AND_OP equality_expression)*
-
-        equality_expression         : relational_expression ((EQ_OP | NE_OP) relational_expression)*
-
-        relational_expression       : shift_expression ((LE_OP | LT_OP | GE_OP | GT_OP) shift_expression)*
-
-        shift_expression            : additive_expression ((LEFT_OP | RIGHT_OP) additive_expression)*
-
-        additive_expression         : multiplicative_expression ((ADD_OP | SUB_OP) multiplicative_expression)*
-
-        multiplicative_expression   : cast_expression ((MUL_OP | DIV_OP | MOD_OP) cast_expression)*
+        binary_operator             : LOG_OR_OP
+                                    | LOG_AND_OP
+                                    | OR_OP
+                                    | XOR_OP
+                                    | AND_OP
+                                    | EQ_OP | NE_OP
+                                    | LE_OP | LT_OP | GE_OP | GT_OP
+                                    | LEFT_OP | RIGHT_OP
+                                    | ADD_OP | SUB_OP
+                                    | MUL_OP | DIV_OP | MOD_OP
+                                      (from the loosest to the tightest binding)
 
         cast_expression             : LPAREN type_spec RPAREN cast_expression
                                     | unary_expression
@@ -1086,6 +956,292 @@ class Parser(object):
         """
         node = self.program()
         if self.current_token.type != EOF:
-            self.error("Expected token <EOF> but found <{}>".format(self.current_token.type))
+            self.error("Expected token <EOF> but found <{}>".format(self.current_token.name))
 
         return node
+
+
+class StackParser(Parser):
+    """ Parser which keeps the nesting of statements and expressions on an
+    explicit stack instead of the Python call stack, so that its depth is
+    only bounded by memory, not by the recursion limit.
+    Each recursive rule has a generator twin, `<rule>_rule`, which yields the
+    generator of every sub rule it needs and is sent back its node; `run`
+    drives them from a list. Declarations and the leaves of the grammar are
+    shared with Parser. It builds the same trees as Parser. """
+
+    @staticmethod
+    def run(rule):
+        """ Drive a generator rule and all of its sub rules to completion """
+        stack = [rule]
+        node = None
+        while stack:
+            try:
+                sub_rule = stack[-1].send(node)
+            except StopIteration as result:
+                stack.pop()
+                node = result.value
+            else:
+                stack.append(sub_rule)
+                node = None
+        return node
+
+    def statement(self):
+        return self.run(self.statement_rule())
+
+    def expression(self):
+        return self.run(self.expression_rule())
+
+    def assignment_expression(self):
+        return self.run(self.assignment_expression_rule())
+
+    def conditional_expression(self):
+        return self.run(self.conditional_expression_rule())
+
+    def statement_rule(self):
+        if self.check_iteration_statement():
+            return (yield self.iteration_statement_rule())
+        elif self.check_selection_statement():
+            return (yield self.selection_statement_rule())
+        elif self.check_jump_statement():
+            return (yield self.jump_statement_rule())
+        elif self.check_compound_statement():
+            return (yield self.compound_statement_rule())
+        return (yield self.expression_statement_rule())
+
+    def compound_statement_rule(self):
+        result = []
+        offset = self.offset
+        self.eat(LBRACKET)
+        while self.current_token.type != RBRACKET:
+            if self.current_token.type in (CHAR, INT, FLOAT, DOUBLE):
+                result.extend(self.declaration_list())
+            else:
+                result.append((yield self.statement_rule()))
+        self.eat(RBRACKET)
+        return CompoundStmt(
+            children=result,
+            offset=offset
+        )
+
+    def jump_statement_rule(self):
+        offset = self.offset
+        if self.current_token.type == RETURN:
+            self.eat(RETURN)
+            expression = self.empty()
+            if self.current_token.type != SEMICOLON:
+                expression = yield self.expression_rule()
+            self.eat(SEMICOLON)
+            return ReturnStmt(
+                expression=expression,
+                offset=offset
+            )
+        return self.jump_statement()
+
+    def selection_statement_rule(self):
+        offset = self.offset
+        self.eat(IF)
+        self.eat(LPAREN)
+        condition = yield self.expression_rule()
+        self.eat(RPAREN)
+        tstatement = yield self.statement_rule()
+        fstatement = self.empty()
+        if self.current_token.type == ELSE:
+            self.eat(ELSE)
+            fstatement = yield self.statement_rule()
+        return IfStmt(
+            condition=condition,
+            tbody=tstatement,
+            fbody=fstatement,
+            offset=offset
+        )
+
+    def iteration_statement_rule(self):
+        offset = self.offset
+        if self.current_token.type == WHILE:
+            self.eat(WHILE)
+            self.eat(LPAREN)
+            expression = yield self.expression_rule()
+            self.eat(RPAREN)
+            statement = yield self.statement_rule()
+            return WhileStmt(
+                condition=expression,
+                body=statement,
+                offset=offset
+            )
+        elif self.current_token.type == DO:
+            self.eat(DO)
+            statement = yield self.statement_rule()
+            self.eat(WHILE)
+            self.eat(LPAREN)
+            expression = yield self.expression_rule()
+            self.eat(RPAREN)
+            self.eat(SEMICOLON)
+            return DoWhileStmt(
+                condition=expression,
+                body=statement,
+                offset=offset
+            )
+        else:
+            self.eat(FOR)
+            self.eat(LPAREN)
+            setup = yield self.expression_statement_rule()
+            condition = yield self.expression_statement_rule()
+            increment = NoOp(offset=self.offset)
+            if self.current_token.type != RPAREN:
+                increment = yield self.expression_rule()
+            self.eat(RPAREN)
+            statement = yield self.statement_rule()
+            return ForStmt(
+                setup=setup,
+                condition=condition,
+                increment=increment,
+                body=statement,
+                offset=offset
+            )
+
+    def expression_statement_rule(self):
+        node = None
+        offset = self.offset
+        if self.current_token.type != SEMICOLON:
+            node = yield self.expression_rule()
+        self.eat(SEMICOLON)
+        return node and node or NoOp(offset=offset)
+
+    def expression_rule(self):
+        result = list()
+        offset = self.offset
+        result.append((yield self.assignment_expression_rule()))
+        while self.current_token.type == COMMA:
+            self.eat(COMMA)
+            result.append((yield self.assignment_expression_rule()))
+        return Expression(
+            children=result,
+            offset=offset
+        )
+
+    def assignment_expression_rule(self):
+        if self.check_assignment_expression():
+            node = self.variable()
+            while self.current_token.type in ASSIGNMENT_OPS:
+                offset = self.offset
+                token = self.current_token
+                self.eat(token.type)
+            return Assign(
+                left=node,
+                op=token,
+                right=(yield self.assignment_expression_rule()),
+                offset=offset
+            )
+        return (yield self.conditional_expression_rule())
+
+    def conditional_expression_rule(self):
+        node = yield self.binary_expression_rule()
+        offset = self.offset
+        if self.current_token.type == QUESTION_MARK:
+            self.eat(QUESTION_MARK)
+            texpression = yield self.expression_rule()
+            self.eat(COLON)
+            fexpression = yield self.conditional_expression_rule()
+            return TerOp(
+                condition=node,
+                texpression=texpression,
+                fexpression=fexpression,
+                offset=offset
+            )
+        return node
+
+    def binary_expression_rule(self, precedence=1):
+        node = yield self.cast_expression_rule()
+        while True:
+            level = BINARY_PRECEDENCE.get(self.current_token.type)
+            if level is None or level < precedence:
+                return node
+            token = self.current_token
+            offset = self.offset
+            self.eat(token.type)
+            node = BinOp(
+                left=node,
+                op=token,
+                right=(yield self.binary_expression_rule(level + 1)),
+                offset=offset
+            )
+
+    def cast_expression_rule(self):
+        offset = self.offset
+        if self.check_cast_expression():
+            self.eat(LPAREN)
+            type_node = self.type_spec()
+            self.eat(RPAREN)
+            return UnOp(
+                op=type_node.token,
+                expr=(yield self.cast_expression_rule()),
+                offset=offset
+            )
+        return (yield self.unary_expression_rule())
+
+    def unary_expression_rule(self):
+        if self.current_token.type in (INC_OP, DEC_OP):
+            token = self.current_token
+            offset = self.offset
+            self.eat(token.type)
+            return UnOp(
+                op=token,
+                expr=(yield self.unary_expression_rule()),
+                offset=offset
+            )
+        elif self.current_token.type in (AND_OP, ADD_OP, SUB_OP, LOG_NEG):
+            token = self.current_token
+            offset = self.offset
+            self.eat(token.type)
+            return UnOp(
+                op=token,
+                expr=(yield self.cast_expression_rule()),
+                offset=offset
+            )
+        return (yield self.postfix_expression_rule())
+
+    def postfix_expression_rule(self):
+        node = yield self.primary_expression_rule()
+        offset = self.offset
+        if self.current_token.type in (INC_OP, DEC_OP):
+            token = self.current_token
+            self.eat(token.type)
+            node = UnOp(
+                op=token,
+                expr=node,
+                offset=offset,
+                prefix=False
+            )
+        elif self.current_token.type == LPAREN:
+            self.eat(LPAREN)
+            args = list()
+            if not self.current_token.type == RPAREN:
+                args.append((yield self.assignment_expression_rule()))
+                while self.current_token.type == COMMA:
+                    self.eat(COMMA)
+                    args.append((yield self.assignment_expression_rule()))
+            self.eat(RPAREN)
+            if not isinstance(node, Var):
+                self.error("Function identifier must be string")
+            node = FunctionCall(
+                name=node.value,
+                args=args,
+                offset=node.offset,
+                symbol=node.symbol
+            )
+        return node
+
+    def primary_expression_rule(self):
+        if self.current_token.type == LPAREN:
+            self.eat(LPAREN)
+            node = yield self.expression_rule()
+            self.eat(RPAREN)
+            return node
+        return self.primary_expression()
+
+
+PARSERS = {
+    'recursive': Parser,
+    'stack': StackParser,
+}
@@ -0,0 +1,151 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from functools import wraps
+from inspect import isgeneratorfunction
+from time import perf_counter
+
+# Methods of the parsers which are plumbing, not grammar rules
+PLUMBING = ('error', 'position', 'peek_token', 'mark', 'reset', 'eat', 'run')
+
+COLUMNS = ('calls', 'inclusive', 'exclusive', 'restores', 'tokens')
+
+
+class RuleStats(object):
+    """ What was spent in one grammar rule. Time is in seconds; inclusive
+    time and tokens count the outermost call only when a rule nests in
+    itself. Restores are the reset() to a mark made while it was running. """
+    __slots__ = COLUMNS + ('active',)
+
+    def __init__(self):
+        self.calls = self.restores = self.tokens = self.active = 0
+        self.inclusive = self.exclusive = 0.0
+
+
+class ParserProfiler(object):
+    """ Counts calls, time, restores and tokens consumed per grammar rule.
+    instrument(parser) shadows the rules of that one parser object with
+    timed wrappers; parsers which are not instrumented run the plain class
+    methods and pay nothing. Several parsers may be instrumented in turn
+    with the same profiler to add up a whole corpus.
+    The generator rules of the StackParser are timed on each resume, their
+    inclusive time runs from their creation to their return. """
+
+    def __init__(self):
+        self.rules = {}
+        # [stats, time spent in the rules it called] of the running rules
+        self.frames = []
+
+    def stats(self, name):
+        if name not in self.rules:
+            self.rules[name] = RuleStats()
+        return self.rules[name]
+
+    def instrument(self, parser):
+        """ Time the grammar rules of parser; returns it """
+        for name in dir(type(parser)):
+            method = getattr(type(parser), name)
+            if name.startswith('_') or name in PLUMBING or not callable(method):
+                continue
+            bound = getattr(parser, name)
+            if isgeneratorfunction(method):
+                setattr(parser, name, self.generator_rule(parser, name, bound))
+            else:
+                setattr(parser, name, self.rule(parser, name, bound))
+        reset = parser.reset
+
+        @wraps(reset)
+        def restore(mark):
+            if self.frames:
+                self.frames[-1][0].restores += 1
+            return reset(mark)
+        parser.reset = restore
+        return parser
+
+    def enter(self, stats):
+        frame = [stats, 0.0]
+        self.frames.append(frame)
+        return frame
+
+    def leave(self, frame, elapsed):
+        self.frames.pop()
+        frame[0].exclusive += elapsed - frame[1]
+        if self.frames:
+            self.frames[-1][1] += elapsed
+
+    def rule(self, parser, name, method):
+        stats = self.stats(name)
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            stats.calls += 1
+            stats.active += 1
+            pos = parser.pos
+            frame = self.enter(stats)
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                self.leave(frame, elapsed)
+                stats.active -= 1
+                if not stats.active:
+                    stats.inclusive += elapsed
+                    stats.tokens += parser.pos - pos
+        return timed
+
+    def generator_rule(self, parser, name, method):
+        stats = self.stats(name)
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            stats.calls += 1
+            stats.active += 1
+            pos = parser.pos
+            created = perf_counter()
+            rule = method(*args, **kwargs)
+            node = None
+            try:
+                while True:
+                    frame = self.enter(stats)
+                    start = perf_counter()
+                    try:
+                        sub_rule = rule.send(node)
+                    except StopIteration as result:
+                        return result.value
+                    finally:
+                        self.leave(frame, perf_counter() - start)
+                    node = yield sub_rule
+            finally:
+                stats.active -= 1
+                if not stats.active:
+                    stats.inclusive += perf_counter() - created
+                    stats.tokens += parser.pos - pos
+        return timed
+
+    def sorted_rules(self, key='exclusive'):
+        """ (name, stats) of the rules which were called, by decreasing key """
+        return sorted(
+            ((name, stats) for name, stats in self.rules.items() if stats.calls),
+            key=lambda item: getattr(item[1], key),
+            reverse=True
+        )
+
+    def to_json(self, key='exclusive'):
+        return [
+            dict(rule=name, **{column: getattr(stats, column) for column in COLUMNS})
+            for name, stats in self.sorted_rules(key)
+        ]
+
+    def report(self, key='exclusive'):
+        """ The rules as a table, times in milliseconds """
+        rules = self.sorted_rules(key)
+        width = max([len(name) for name, _ in rules] + [4])
+        lines = ['{:<{}} {:>10} {:>12} {:>12} {:>9} {:>10}'.format(
+            'rule', width, 'calls', 'incl. (ms)', 'excl. (ms)', 'restores', 'tokens'
+        )]
+        for name, stats in rules:
+            lines.append('{:<{}} {:>10} {:>12.3f} {:>12.3f} {:>9} {:>10}'.format(
+                name, width, stats.calls, stats.inclusive * 1000, stats.exclusive * 1000,
+                stats.restores, stats.tokens
+            ))
+        return '\n'.join(lines)
@@ -2,142 +2,203 @@
 import sys
 
 class Node(object):
-    def __init__(self, line, char):
-        self.line = line
-        self.char = char
+    """ Base class of the AST nodes. A node only records the offset of the
+    token it starts at (its operator for expressions); Program.lines turns
+    it into a (line, char) position when one is needed.
+    Nodes have slots and no __dict__: a class lists in __slots__ only the
+    fields it adds, and derived values (value, symbol) are properties. """
+    __slots__ = ('offset',)
+
+    def __init__(self, offset):
+        self.offset = offset
+
+    def __deepcopy__(self, memo):
+        # trees are not modified once analyzed, copies of the interpreter
+        # memory (break point snapshots) share them instead of copying code
+        return self
 
 
 class NoOp(Node):
-    pass
+    __slots__ = ()
 
 class StructType(Node):
-    def __init__(self, token, struct_name, struct_body, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('token', 'struct_name', 'struct_body')
+
+    def __init__(self, token, struct_name, struct_body, offset):
+        Node.__init__(self, offset)
         self.token = token
         self.struct_name = struct_name# A struct name
         self.struct_body = struct_body
 
-class FunctionBody(Node):
-    def __init__(self, children, line, char):
-        Node.__init__(self, line, char)
-        self.children = children
+class Leaf(Node):
+    """ Node made of a single token, its value is the token value """
+    __slots__ = ('token',)
 
-class Num(Node):
-    def __init__(self, token, line, char):
-        Node.__init__(self, line, char)
+    def __init__(self, token, offset):
+        Node.__init__(self, offset)
         self.token = token
-        self.value = token.value
 
+    @property
+    def value(self):
+        return self.token.value
 
-class String(Node):
-    def __init__(self, token, line, char):
-        Node.__init__(self, line, char)
-        self.token = token
-        self.value = token.value
 
+class Num(Leaf):
+    __slots__ = ('ctype',)
 
-class Type(Node):
-    def __init__(self, token, line, char):
-        Node.__init__(self, line, char)
-        self.token = token
-        self.value = token.value
+    def __init__(self, token, offset):
+        Leaf.__init__(self, token, offset)
+        self.ctype = None           # set by the semantic analyzer
 
 
-class Var(Node):
-    def __init__(self, token, line, char):
-        Node.__init__(self, line, char)
-        self.token = token
-        self.value = token.value
+class String(Leaf):
+    __slots__ = ()
+
+
+class Type(Leaf):
+    __slots__ = ()
+
+
+class Var(Leaf):
+    __slots__ = ('depth', 'slot', 'ctype')
+
+    def __init__(self, token, offset):
+        Leaf.__init__(self, token, offset)
+        # set by the semantic analyzer: level of the scope which declares
+        # the variable (1 is the global one), its index in that scope and
+        # the name of its type
+        self.depth = None
+        self.slot = None
+        self.ctype = None
+
+    @property
+    def symbol(self):
+        """ Id of the name in the NameTable """
+        return self.token.symbol
 
 class StructVar(Node):
-    def __init__(self, token, struct_name, struct_variable, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('token', 'struct_name', 'struct_variable')
+
+    def __init__(self, token, struct_name, struct_variable, offset):
+        Node.__init__(self, offset)
         self.token = token
         self.struct_name = struct_name
         self.struct_variable = struct_variable
 
 
 class BinOp(Node):
-    def __init__(self, left, op, right, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('left', 'op', 'right', 'ctype', 'conversion')
+
+    def __init__(self, left, op, right, offset):
+        Node.__init__(self, offset)
         self.left = left
-        self.token = self.op = op
+        self.op = op
         self.right = right
+        # set by the semantic analyzer: the name of the type of the result
+        # and the one both operands are converted to, if they differ
+        self.ctype = None
+        self.conversion = None
 
 
 class UnOp(Node):
-    def __init__(self, op, expr, line, char, prefix=True):
-        Node.__init__(self, line, char)
-        self.token = self.op = op
+    __slots__ = ('op', 'expr', 'prefix', 'ctype')
+
+    def __init__(self, op, expr, offset, prefix=True):
+        Node.__init__(self, offset)
+        self.op = op
         self.expr = expr
         self.prefix = prefix
+        self.ctype = None           # set by the semantic analyzer
 
 
 class TerOp(Node):
-    def __init__(self, condition, texpression, fexpression, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('condition', 'texpression', 'fexpression', 'ctype')
+
+    def __init__(self, condition, texpression, fexpression, offset):
+        Node.__init__(self, offset)
         self.condition = condition
         self.texpression = texpression
         self.fexpression = fexpression
+        self.ctype = None           # set by the semantic analyzer
 
 
 class Assign(Node):
-    def __init__(self, left, op, right, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('left', 'op', 'right', 'ctype', 'conversion')
+
+    def __init__(self, left, op, right, offset):
+        Node.__init__(self, offset)
         self.left = left
-        self.token = self.op = op
+        self.op = op
         self.right = right
+        # set by the semantic analyzer: the name of the type of the value
+        # assigned, and the type of left if the value is converted to it
+        self.ctype = None
+        self.conversion = None
 
 
 class Expression(Node):
-    def __init__(self, children, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('children',)
+
+    def __init__(self, children, offset):
+        Node.__init__(self, offset)
         self.children = children
 
 
 class FunctionCall(Node):
-    def __init__(self, name, args, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('name', 'args', 'symbol', 'ctype')
+
+    def __init__(self, name, args, offset, symbol=None):
+        Node.__init__(self, offset)
         self.name = name
         self.args = args            # a list of Param nodes
+        self.symbol = symbol        # id of the name in the NameTable
+        self.ctype = None           # set by the semantic analyzer
 
 
 class IfStmt(Node):
-    def __init__(self, condition, tbody, line, char, fbody=None):
-        Node.__init__(self, line, char)
+    __slots__ = ('condition', 'tbody', 'fbody')
+
+    def __init__(self, condition, tbody, offset, fbody=None):
+        Node.__init__(self, offset)
         self.condition = condition
         self.tbody = tbody
         self.fbody = fbody
 
 
 class WhileStmt(Node):
-    def __init__(self, condition, body, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('condition', 'body')
+
+    def __init__(self, condition, body, offset):
+        Node.__init__(self, offset)
         self.condition = condition
         self.body = body
 
 
 class DoWhileStmt(WhileStmt):
-    pass
+    __slots__ = ()
 
 
 class ReturnStmt(Node):
-    def __init__(self, expression, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('expression',)
+
+    def __init__(self, expression, offset):
+        Node.__init__(self, offset)
         self.expression = expression
 
 
 class BreakStmt(Node):
-    pass
+    __slots__ = ()
 
 
 class ContinueStmt(Node):
-    pass
+    __slots__ = ()
 
 
 class ForStmt(Node):
-    def __init__(self, setup, condition, increment, body, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('setup', 'condition', 'increment', 'body')
+
+    def __init__(self, setup, condition, increment, body, offset):
+        Node.__init__(self, offset)
         self.setup = setup
         self.condition = condition
         self.increment = increment
@@ -145,56 +206,131 @@ class ForStmt(Node):
 
 
 class CompoundStmt(Node):
-    def __init__(self, children, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('children',)
+
+    def __init__(self, children, offset):
+        Node.__init__(self, offset)
         self.children = children
 
 class StructDecl(Node):
-    def __init__(self, token, struct_name, struct_type, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('struct_name', 'struct_type')
+
+    def __init__(self, token, struct_name, struct_type, offset):
+        Node.__init__(self, offset)
         self.struct_name = struct_name# A struct name
         self.struct_type = struct_type
 
 
 class VarDecl(Node):
-    def __init__(self, var_node, type_node, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('var_node', 'type_node')
+
+    def __init__(self, var_node, type_node, offset):
+        Node.__init__(self, offset)
         self.var_node = var_node
         self.type_node = type_node
 
 
 class IncludeLibrary(Node):
-    def __init__(self, library_name, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('library_name',)
+
+    def __init__(self, library_name, offset):
+        Node.__init__(self, offset)
         self.library_name = library_name
 
 
 class Param(Node):
-    def __init__(self, type_node, var_node, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('var_node', 'type_node')
+
+    def __init__(self, type_node, var_node, offset):
+        Node.__init__(self, offset)
         self.var_node = var_node
         self.type_node = type_node
 
 
 class FunctionDecl(Node):
-    def __init__(self, type_node, func_name, params, body, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('type_node', 'func_name', 'params', 'body')
+
+    def __init__(self, type_node, func_name, params, body, offset):
+        Node.__init__(self, offset)
         self.type_node = type_node
         self.func_name = func_name
         self.params = params            # a list of Param nodes
-        self.body = body
+        self.body = body                # a FunctionBody, or a LazyBody until called
+
+    def load_body(self):
+        """ The FunctionBody, parsed and analyzed now if it was left lazy """
+        if isinstance(self.body, LazyBody):
+            self.body = self.body.load()
+        return self.body
 
 
 class FunctionBody(Node):
-    def __init__(self, children, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('children',)
+
+    def __init__(self, children, offset):
+        Node.__init__(self, offset)
         self.children = children
 
 
+class LazyBody(Node):
+    """ Function body not parsed yet: the tokens [start, stop) of the
+    source. load() parses them with `parse`, then hands the FunctionBody to
+    `analyze`, which the semantic analyzer sets, and returns it. """
+    __slots__ = ('start', 'stop', 'parse', 'analyze')
+
+    def __init__(self, start, stop, parse, offset):
+        Node.__init__(self, offset)
+        self.start = start
+        self.stop = stop
+        self.parse = parse
+        self.analyze = None
+
+    def load(self):
+        body = self.parse(self.start)
+        if self.analyze is not None:
+            self.analyze(body)
+        return body
+
+
 class Program(Node):
-    def __init__(self, declarations, line, char):
-        Node.__init__(self, line, char)
+    __slots__ = ('children', 'lines', 'names')
+
+    def __init__(self, declarations, offset, lines=None, names=None):
+        Node.__init__(self, offset)
         self.children = declarations
+        self.lines = lines          # LineIndex of the source text
+        self.names = names          # NameTable of the identifiers
+
+
+def fields(node):
+    """ (name, value) of every field of node, inherited ones first """
+    for cls in reversed(type(node).__mro__[:-1]):
+        for name in cls.__dict__.get('__slots__', ()):
+            yield name, getattr(node, name)
+
+
+def tree_stats(tree):
+    """ Footprint of a tree: number of nodes, number per node class and size
+    in bytes of the nodes and of the lists holding them. Tokens are left out,
+    they are shared with the token buffer. """
+    kinds = {}
+    size = 0
+    seen = set()
+    stack = [tree]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, Node):
+            name = type(item).__name__
+            kinds[name] = kinds.get(name, 0) + 1
+            size += sys.getsizeof(item)
+            stack.extend(value for _, value in fields(item))
+        elif isinstance(item, list):
+            size += sys.getsizeof(item)
+            stack.extend(item)
+    return {'nodes': sum(kinds.values()), 'bytes': size, 'kinds': kinds}
 
 
 ###############################################################################
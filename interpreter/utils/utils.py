@@ -1,6 +1,5 @@
 # -*- coding:utf8 -*-
 from functools import wraps
-import pickle
 import importlib
 
 def import_module(libname):
@@ -16,17 +15,6 @@ def get_functions(module):
         if callable(func) and not func_name.startswith('__') and func.__module__.endswith(module):
             yield func
 
-def restorable(fn):
-    """ Decorator reset object state after calling function """
-    @wraps(fn)
-    def wrapper(self, *args, **kwargs):
-        state = pickle.dumps(self.__dict__)
-        result = fn(self, *args, **kwargs)
-        self.__dict__ = pickle.loads(state)
-        return result
-    return wrapper
-
-
 def definition(return_type=None, arg_types=[]):
     """ Decorator used for definition of builtin function """
     def wrapper_decorator(fn):
@@ -39,20 +27,6 @@ def definition(return_type=None, arg_types=[]):
     return wrapper_decorator
 
 
-def get_name(name):
-    """ Calculate name using nex sequence value"""
-    if name[-2:].isdigit():
-        return '{}{:02d}'.format(
-            name[:-2],
-            int(name[-2:]) + 1
-        )
-    else:
-        return '{}{:02d}'.format(
-            name,
-            1
-        )
-
-
 class MessageColor:
     HEADER = '\033[95m'
     OKBLUE = '\033[94m'
@@ -0,0 +1,34 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+import os
+from interpreter.benchmark.corpus import generate
+from interpreter.lexical_analysis.token import Token
+from interpreter.syntax_analysis.tree import Node, fields
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def samples():
+    """ name -> source of the sample programs, each one run by the interpreter """
+    with open(os.path.join(ROOT, 'fibo.c')) as file:
+        programs = {'fibo': file.read()}
+    programs['functions'] = generate(functions=6, statements=6)
+    programs['comments'] = generate(functions=3, comment_lines=3, seed=1)
+    programs['structs'] = generate(functions=2, structs=4, seed=2)
+    programs['literals'] = generate(functions=3, digits=12, seed=3)
+    return programs
+
+
+def shape(value):
+    """ Comparable form of a tree: node classes, offsets and fields, the
+    ids of the names and the hooks of lazy bodies left out """
+    if isinstance(value, Node):
+        return (type(value).__name__, value.offset, [
+            (name, shape(field)) for name, field in fields(value)
+            if name not in ('lines', 'names', 'symbol', 'parse', 'analyze')
+        ])
+    if isinstance(value, list):
+        return [shape(item) for item in value]
+    if isinstance(value, Token):
+        return (value.type, value.value)
+    return value
@@ -0,0 +1,47 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from contextlib import redirect_stdout
+from io import StringIO
+import unittest
+from interpreter.lexical_analysis.lexer import RegexLexer
+from interpreter.syntax_analysis.parser import Parser
+from interpreter.syntax_analysis.arena import NodeArena, VERSION
+from interpreter.semantic_analysis.analyzer import SemanticAnalyzer
+from helpers import samples, shape
+
+
+def analyzed(code):
+    tree = Parser(RegexLexer(code)).parse()
+    with redirect_stdout(StringIO()):
+        SemanticAnalyzer.analyze(tree)
+    return tree
+
+
+class TestNodeArena(unittest.TestCase):
+
+    def test_round_trip(self):
+        for name, code in samples().items():
+            with self.subTest(name):
+                tree = analyzed(code)
+                arena = NodeArena(tree)
+                self.assertEqual(shape(arena.tree()), shape(tree))
+                copy = NodeArena.from_buffer(arena.to_bytes()).tree()
+                self.assertEqual(shape(copy), shape(tree))
+                self.assertEqual(copy.lines.starts, tree.lines.starts)
+                self.assertEqual(copy.names.names, tree.names.names)
+
+    def test_wrong_version(self):
+        data = bytearray(NodeArena(analyzed(samples()['fibo'])).to_bytes())
+        data[4] = VERSION + 1
+        with self.assertRaises(ValueError):
+            NodeArena.from_buffer(bytes(data))
+
+    def test_wrong_magic(self):
+        data = bytearray(NodeArena(analyzed(samples()['fibo'])).to_bytes())
+        data[0:4] = b'XXXX'
+        with self.assertRaises(ValueError):
+            NodeArena.from_buffer(bytes(data))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+import random
+import unittest
+from interpreter.lexical_analysis.buffer import TokenBuffer
+from interpreter.lexical_analysis.lexer import SCANNERS, LexicalError
+from helpers import samples
+
+SNIPPETS = (' ', '\n', 'x', '1', '+', '=', ';', '(', ')', '{', '}', '/* é */', '// é\n', '"s"', 'int ', '<<', '.5')
+
+
+def stream(tokens):
+    """ (kind, value, offset) of every token of a buffer """
+    return [(tokens.kind(index), tokens.value(index), tokens.offsets[index]) for index in range(len(tokens))]
+
+
+class TestRelex(unittest.TestCase):
+
+    def check(self, scanner, text, edits=200, seed=0):
+        """ After each random edit, the buffer holds the tokens of a scan of
+        the new text from scratch """
+        rng = random.Random(seed)
+        encode = (lambda value: value.encode()) if scanner == 'mmap' else (lambda value: value)
+        text = encode(text)
+        tokens = TokenBuffer(SCANNERS[scanner](text))
+        for _ in range(edits):
+            offset = rng.randrange(len(text) + 1)
+            deleted = rng.choice((0, 0, 1, 3))
+            inserted = encode(rng.choice(SNIPPETS)) if rng.random() < 0.7 else encode('')
+            new = text[:offset] + inserted + text[offset + deleted:]
+            try:
+                expected = TokenBuffer(SCANNERS[scanner](new))
+            except LexicalError:
+                continue
+            relexed = tokens.relex(text, offset, deleted, inserted)
+            self.assertEqual(relexed.text, new)
+            self.assertEqual(stream(tokens), stream(expected))
+            text = new
+
+    def test_random_edits(self):
+        code = samples()['comments'] + '/* é */\n'
+        for scanner in sorted(SCANNERS):
+            with self.subTest(scanner=scanner):
+                self.check(scanner, code)
+
+    def test_scanner_kept(self):
+        tokens = TokenBuffer(SCANNERS['mmap'](b'/* \xc3\xa9 */ int x;'))
+        tokens.relex(b'/* \xc3\xa9 */ int x;', 0, 0, b' ')
+        # offsets still count bytes: the é takes two
+        self.assertEqual(list(tokens.offsets), [10, 14, 15, 16])
+
+
+if __name__ == '__main__':
+    unittest.main()
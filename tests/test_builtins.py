@@ -0,0 +1,48 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from contextlib import redirect_stdout
+from io import StringIO
+import unittest
+from interpreter.__builtins__ import Builtin, libraries, library
+from interpreter.interpreter.interpreter import Interpreter
+from interpreter.lexical_analysis.lexer import RegexLexer
+from interpreter.syntax_analysis.parser import Parser
+from interpreter.semantic_analysis.analyzer import SemanticAnalyzer, SemanticError
+
+UNKNOWN = '#include <nope.h>\n\nint main() {\n    return 0;\n}\n'
+
+
+class TestLibraries(unittest.TestCase):
+
+    def test_known_headers(self):
+        self.assertEqual(set(libraries()), {'stdio', 'math'})
+        stdio = library('stdio')
+        self.assertEqual(
+            {name: (builtin.return_type, builtin.arg_types) for name, builtin in stdio.items()},
+            {'printf': ('int', None), 'scanf': ('int', None), 'getchar': ('char', [])},
+        )
+        sqrt = library('math')['sqrt']
+        self.assertIsInstance(sqrt, Builtin)
+        self.assertEqual((sqrt.name, sqrt.return_type, sqrt.arg_types), ('sqrt', 'double', ['double']))
+        self.assertEqual(sqrt.function(16.0), 4.0)
+        self.assertIs(library('math'), library('math'))
+
+    def test_unknown_header(self):
+        self.assertIsNone(library('nope'))
+
+    def test_unknown_include(self):
+        tree = Parser(RegexLexer(UNKNOWN)).parse()
+        with self.assertRaisesRegex(SemanticError, r"^Library 'nope\.h' not found at line 1$"):
+            SemanticAnalyzer.analyze(tree)
+
+    def test_unknown_include_run(self):
+        output = StringIO()
+        with redirect_stdout(output):
+            Interpreter.run(UNKNOWN)
+        self.assertIn("[SemanticError] Library 'nope.h' not found at line 1", output.getvalue())
+        self.assertIn('Process terminated with status -1', output.getvalue())
+        self.assertNotIn('Traceback', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from contextlib import redirect_stdout
+from io import StringIO
+import os
+import tempfile
+import unittest
+from unittest import mock
+from interpreter.cache import Cache
+from interpreter.lexical_analysis.lexer import RegexLexer
+from interpreter.syntax_analysis.parser import Parser
+from interpreter.semantic_analysis.analyzer import SemanticAnalyzer
+from helpers import samples, shape
+
+
+def analyzed(code):
+    tree = Parser(RegexLexer(code)).parse()
+    with redirect_stdout(StringIO()):
+        SemanticAnalyzer.analyze(tree)
+    return tree
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = Cache(self.directory.name)
+        self.code = samples()['fibo']
+        self.tree = analyzed(self.code)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_hit(self):
+        key = self.cache.key(self.code)
+        self.cache.store(key, self.tree, 'a warning\n')
+        tree, warnings = self.cache.load(key)
+        self.assertEqual(shape(tree), shape(self.tree))
+        self.assertEqual(warnings, 'a warning\n')
+
+    def test_miss_after_edit(self):
+        self.cache.store(self.cache.key(self.code), self.tree)
+        edited = self.code.replace('127', '128')
+        self.assertIsNone(self.cache.load(self.cache.key(edited)))
+
+    def test_scanner_in_key(self):
+        self.assertNotEqual(self.cache.key(self.code, 'regex'), self.cache.key(self.code, 'mmap'))
+        self.assertEqual(self.cache.key(self.code, 'mmap'), self.cache.key(self.code.encode(), 'mmap'))
+
+    def test_corrupt_entry_removed(self):
+        key = self.cache.key(self.code)
+        os.makedirs(self.directory.name, exist_ok=True)
+        with open(self.cache.path(key), 'wb') as file:
+            file.write(b'\x01')
+        self.assertIsNone(self.cache.load(key))
+        self.assertFalse(os.path.exists(self.cache.path(key)))
+
+    def test_atomic_write(self):
+        key = self.cache.key(self.code)
+        self.cache.store(key, self.tree)
+        with open(self.cache.path(key), 'rb') as file:
+            before = file.read()
+        # a write failing half way leaves the old entry and no temporary file
+        with mock.patch('os.replace', side_effect=OSError):
+            self.cache.store(key, analyzed(self.code.replace('127', '12')))
+        with open(self.cache.path(key), 'rb') as file:
+            self.assertEqual(file.read(), before)
+        self.assertEqual(os.listdir(self.directory.name), [os.path.basename(self.cache.path(key))])
+
+    def test_lru_eviction(self):
+        self.cache.store('a', self.tree)
+        size = os.path.getsize(self.cache.path('a'))
+        self.cache.max_size = 2 * size
+        self.cache.store('b', self.tree)
+        os.utime(self.cache.path('a'), (1000, 1000))
+        os.utime(self.cache.path('b'), (2000, 2000))
+        # loading a makes it the most recently used
+        self.assertIsNotNone(self.cache.load('a'))
+        self.cache.store('c', self.tree)
+        self.assertIsNotNone(self.cache.load('a'))
+        self.assertIsNone(self.cache.load('b'))
+        self.assertIsNotNone(self.cache.load('c'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from contextlib import redirect_stdout
+from io import StringIO
+import unittest
+from interpreter.incremental import Compilation
+from interpreter.lexical_analysis.lexer import LexicalError
+from interpreter.syntax_analysis.tree import FunctionDecl
+from helpers import shape
+
+PROGRAM = '''int first() {
+    return 1;
+}
+
+int second() {
+    return 4;
+}
+
+int main() {
+    return first();
+}
+'''
+
+
+def outcome(compile):
+    """ The tree compile() returns, its function bodies loaded, or the
+    error it raises """
+    try:
+        with redirect_stdout(StringIO()):
+            tree = compile()
+            for node in tree.children:
+                if isinstance(node, FunctionDecl):
+                    node.load_body()
+    except Exception as error:
+        return type(error).__name__, str(error)
+    return shape(tree)
+
+
+class TestCompilation(unittest.TestCase):
+
+    def check(self, compilation, offset, deleted, inserted):
+        """ An edit gives what compiling its text from scratch gives """
+        text = compilation.text[:offset] + inserted + compilation.text[offset + deleted:]
+        self.assertEqual(
+            outcome(lambda: compilation.edit(offset, deleted, inserted)),
+            outcome(lambda: Compilation(text, strict=compilation.strict).tree)
+        )
+        self.assertEqual(compilation.text, text)
+
+    def test_edits(self):
+        for strict in (True, False):
+            with self.subTest(strict=strict):
+                compilation = Compilation(PROGRAM, strict=strict)
+                self.check(compilation, PROGRAM.index('4'), 1, '5')
+                self.check(compilation, PROGRAM.index('int main'), 0, 'int third() {\n    return 3;\n}\n\n')
+                self.check(compilation, compilation.text.index('first();'), len('first'), 'third')
+
+    def test_use_before_declaration(self):
+        for strict in (True, False):
+            with self.subTest(strict=strict):
+                compilation = Compilation(PROGRAM, strict=strict)
+                # first calls second, which is declared after it
+                self.check(compilation, PROGRAM.index('1;'), 1, 'second()')
+                self.check(compilation, PROGRAM.index('second()'), len('second()'), '1')
+
+    def test_edit_which_does_not_lex(self):
+        compilation = Compilation(PROGRAM)
+        offset = PROGRAM.index('return 1')
+        with self.assertRaises(LexicalError):
+            compilation.edit(offset, 0, '"')
+        self.assertEqual(compilation.text, PROGRAM[:offset] + '"' + PROGRAM[offset:])
+        self.check(compilation, offset, 1, '')
+
+
+if __name__ == '__main__':
+    unittest.main()
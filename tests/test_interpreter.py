@@ -0,0 +1,118 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from threading import Event
+import unittest
+from interpreter.interpreter.interpreter import Interpreter, INT_OPERATORS
+from interpreter.lexical_analysis.token_type import LOG_AND_OP, LOG_OR_OP
+from interpreter.lexical_analysis.lexer import RegexLexer
+from interpreter.syntax_analysis.parser import Parser
+from interpreter.semantic_analysis.analyzer import SemanticAnalyzer
+from interpreter.syntax_analysis.tree import Assign, BinOp
+
+OPERATORS = ('+', '-', '*', '/', '%', '<', '>', '<=', '>=', '==', '!=', '&', '|', '^', '<<', '>>', '&&', '||')
+
+# operands, wrapping around, shifted past the width and equal
+OPERANDS = ((4000000000, 3), (7, 35), (5, 5), (0, 1))
+
+PROGRAM = '''int main() {
+    int a, b;
+    a = %d;
+    b = %d;
+    return (a %s b) + (b %s a) * 3;
+}
+'''
+
+
+def analyzed(code):
+    tree = Parser(RegexLexer(code)).parse()
+    SemanticAnalyzer.analyze(tree)
+    return tree
+
+
+def expression(code):
+    """ The analyzed expression of the statement code, with the variables a
+    and b int, f float and c char """
+    tree = analyzed('int main() { int a, b; float f; char c; %s; }' % code)
+    statement = tree.children[0].body.children[-1]
+    return statement.children[0]
+
+
+def evaluate(code, generic=False):
+    """ The value main returns; with generic, BinOp are run by the
+    generic path, which a break point on a line without code forces """
+    interpreter = Interpreter([(code.count('\n') + 1, 1)] if generic else [], Event())
+    return interpreter.interpret(analyzed(code)).val
+
+
+class TestBreakPoints(unittest.TestCase):
+
+    def test_line_past_the_end(self):
+        tree = analyzed('int main() {\n    return 0;\n}\n')
+        with self.assertRaisesRegex(ValueError, 'Line 99 is out of the text'):
+            Interpreter([(99, 1)], Event()).interpret(tree)
+
+    def test_line_zero(self):
+        tree = analyzed('int main() {\n    return 0;\n}\n')
+        with self.assertRaisesRegex(ValueError, 'Line 0 is out of the text'):
+            Interpreter([(0, 1)], Event()).interpret(tree)
+
+
+class TestIntOperators(unittest.TestCase):
+
+    def test_all_listed(self):
+        types = {expression('a %s b' % op).op.type for op in OPERATORS}
+        self.assertEqual(types, set(INT_OPERATORS) | {LOG_AND_OP, LOG_OR_OP})
+
+    def test_fast_path_as_generic(self):
+        for op in OPERATORS:
+            for left, right in OPERANDS:
+                if op in ('/', '%') and 0 in (left, right):
+                    continue
+                code = PROGRAM % (left, right, op, op)
+                with self.subTest(op=op, left=left, right=right):
+                    self.assertEqual(evaluate(code), evaluate(code, generic=True))
+
+    def test_values(self):
+        mask = 0xffffffff
+        for left, right, ops, value in (
+            (4000000000, 3, ('<<', '-'), ((4000000000 << 3) + (3 - 4000000000) * 3) & mask),
+            # the count of a shift is taken modulo 32
+            (7, 35, ('<<', '&'), (7 << 3) + 3 * 3),
+            (7, 35, ('>>', '|'), 0 + 39 * 3),
+            (0, 1, ('&&', '||'), 0 + 1 * 3),
+            (1, 2, ('-', '+'), (1 - 2 + 3 * 3) & mask),
+        ):
+            with self.subTest(ops=ops, left=left, right=right):
+                self.assertEqual(evaluate(PROGRAM % ((left, right) + ops)), value)
+
+
+class TestConversions(unittest.TestCase):
+
+    def test_binop(self):
+        for code, ctype, conversion in (
+            ('a + b', 'int', None),
+            ('a + 1.5', 'float', 'float'),
+            ('f * 2', 'float', 'float'),
+            ('f - f', 'float', None),
+            ('c + a', 'int', 'int'),
+        ):
+            with self.subTest(code):
+                node = expression(code)
+                self.assertIsInstance(node, BinOp)
+                self.assertEqual((node.ctype, node.conversion), (ctype, conversion))
+
+    def test_assign(self):
+        for code, ctype, conversion in (
+            ('a = b', 'int', None),
+            ('a = f', 'float', 'int'),
+            ('f = a + 1', 'int', 'float'),
+            ('a = f + 1', 'float', 'int'),
+        ):
+            with self.subTest(code):
+                node = expression(code)
+                self.assertIsInstance(node, Assign)
+                self.assertEqual((node.ctype, node.conversion), (ctype, conversion))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from contextlib import redirect_stdout
+from io import StringIO
+import unittest
+from interpreter.lexical_analysis.lexer import RegexLexer
+from interpreter.syntax_analysis.parser import Parser
+from interpreter.syntax_analysis.tree import FunctionDecl
+from interpreter.semantic_analysis.analyzer import SemanticAnalyzer, SemanticError
+
+PROGRAMS = {
+    'later_function': '''
+int first() {
+    return second();
+}
+
+int second() {
+    return 4;
+}
+
+int main() {
+    return first();
+}
+''',
+    'later_global': '''
+int f() {
+    return g;
+}
+
+int main() {
+    return f();
+}
+
+int g;
+''',
+    'earlier_function': '''
+int second() {
+    return 4;
+}
+
+int first() {
+    return second();
+}
+
+int main() {
+    return first();
+}
+''',
+    'recursion': '''
+int f(int n) {
+    return f(n);
+}
+
+int main() {
+    return 0;
+}
+''',
+    'undeclared': '''
+int main() {
+    return y;
+}
+''',
+}
+
+
+def analyze(code, strict):
+    """ Analyze code, then load every function body; the SemanticError
+    raised, None if there is none """
+    try:
+        with redirect_stdout(StringIO()):
+            tree = Parser(RegexLexer(code), lazy=not strict).parse()
+            SemanticAnalyzer.analyze(tree, strict)
+            for node in tree.children:
+                if isinstance(node, FunctionDecl):
+                    node.load_body()
+    except SemanticError as error:
+        return str(error)
+    return None
+
+
+class TestLazyBodies(unittest.TestCase):
+
+    def test_same_errors_as_strict(self):
+        for name, code in PROGRAMS.items():
+            with self.subTest(name):
+                self.assertEqual(analyze(code, strict=False), analyze(code, strict=True))
+
+    def test_later_declarations_rejected(self):
+        for name in ('later_function', 'later_global'):
+            with self.subTest(name):
+                self.assertIsNotNone(analyze(PROGRAMS[name], strict=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
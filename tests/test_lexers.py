@@ -0,0 +1,60 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+import unittest
+from interpreter.lexical_analysis.lexer import SCANNERS, LexicalError
+from helpers import samples
+
+ERRORS = {
+    'unterminated_comment': 'int main() {\n    /* no end\n    return 0;\n}\n',
+    'unfinished_string': 'int main() {\n    printf("abc);\n}\n',
+    'bad_char': 'int main() {\n    int x = 1 @ 2;\n}\n',
+}
+
+PUNCTUATORS = 'a<<=b>>=c->d++e--f&&g||h<=i>=j==k!=l+=m-=n*=o/=p%=q&=r^=s|=t...u<<v>>w'
+
+
+def scan(scanner, code):
+    """ (kind, value, start offset) of every token of code, up to the
+    error which stopped the scanner, if any """
+    lexer = SCANNERS[scanner](code.encode() if scanner == 'mmap' else code)
+    tokens = []
+    try:
+        for token in lexer.tokens():
+            tokens.append((token.type, token.value, lexer.start))
+    except LexicalError as error:
+        return tokens, str(error)
+    return tokens, None
+
+
+class TestScanners(unittest.TestCase):
+
+    def check(self, code):
+        expected = scan('classic', code)
+        for scanner in ('regex', 'mmap'):
+            with self.subTest(scanner=scanner):
+                self.assertEqual(scan(scanner, code), expected)
+
+    def test_samples(self):
+        for name, code in samples().items():
+            with self.subTest(name):
+                self.check(code)
+
+    def test_punctuators(self):
+        # longest match first, as the trie walks it
+        self.check(PUNCTUATORS)
+
+    def test_errors(self):
+        for name, code in ERRORS.items():
+            with self.subTest(name):
+                self.assertIsNotNone(scan('classic', code)[1])
+                self.check(code)
+
+    def test_mmap_offsets_count_bytes(self):
+        code = 'int main() {\n    // é\n    return 0;\n}\n'
+        chars = [start for _, _, start in scan('regex', code)[0]]
+        data = [start for _, _, start in scan('mmap', code)[0]]
+        self.assertEqual(data, [len(code[:start].encode()) for start in chars])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+import unittest
+from interpreter.lexical_analysis.lexer import RegexLexer
+from interpreter.syntax_analysis.parser import PARSERS
+from interpreter.syntax_analysis.tree import Assign, BinOp, Expression, TerOp, UnOp
+
+# expression: its grouping, as C reads it
+GROUPINGS = {
+    'a || b && c': '(a || (b && c))',
+    'a && b || c': '((a && b) || c)',
+    'a < b < c': '((a < b) < c)',
+    'a == b != c': '((a == b) != c)',
+    'a - b - c': '((a - b) - c)',
+    'a / b * c': '((a / b) * c)',
+    'a << b + c': '(a << (b + c))',
+    'a << b << c': '((a << b) << c)',
+    'a + b * c': '(a + (b * c))',
+    'a | b ^ c & d': '(a | (b ^ (c & d)))',
+    'a & b == c': '(a & (b == c))',
+    'a < b + c': '(a < (b + c))',
+    'a = b = c': '(a = (b = c))',
+    'a += b - c': '(a += (b - c))',
+    'a ? b : c ? d : e': '(a ? b : (c ? d : e))',
+    'a || b ? c : d': '((a || b) ? c : d)',
+    '-a * b': '((-a) * b)',
+}
+
+
+def grouping(node):
+    """ The expression of node with one pair of parentheses per operator """
+    if isinstance(node, (BinOp, Assign)):
+        return '({} {} {})'.format(grouping(node.left), node.op.value, grouping(node.right))
+    if isinstance(node, TerOp):
+        return '({} ? {} : {})'.format(
+            grouping(node.condition), grouping(node.texpression), grouping(node.fexpression)
+        )
+    if isinstance(node, Expression):
+        return ', '.join(grouping(child) for child in node.children)
+    if isinstance(node, UnOp):
+        return '({}{})'.format(node.op.value, grouping(node.expr))
+    return str(node.value)
+
+
+def parse_expression(parser, code):
+    tree = PARSERS[parser](RegexLexer('int main() { %s; }' % code)).parse()
+    statement, = tree.children[0].body.children
+    expression, = statement.children
+    return expression
+
+
+class TestPrecedence(unittest.TestCase):
+
+    def test_groupings(self):
+        for parser in sorted(PARSERS):
+            for code, expected in GROUPINGS.items():
+                with self.subTest(parser=parser, code=code):
+                    self.assertEqual(grouping(parse_expression(parser, code)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
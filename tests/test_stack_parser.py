@@ -0,0 +1,66 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+import unittest
+from interpreter.lexical_analysis.lexer import RegexLexer
+from interpreter.syntax_analysis.parser import Parser, StackParser
+from interpreter.syntax_analysis.tree import Node, fields
+from helpers import shape
+
+DEPTH = 10000
+
+
+def programs(n):
+    """ Programs nesting one construct n times """
+    return {
+        'blocks': 'int main() { %s x = 1; %s }' % ('{' * n, '}' * n),
+        'else_if': 'int main() { %s x = 0; }' % ''.join('if (x == %d) x = 1; else ' % i for i in range(n)),
+        'while': 'int main() { %s x++; }' % ('while (x) ' * n),
+        'for': 'int main() { %s x++; }' % ('for (x = 0; x < 1; x++) ' * n),
+        'do': 'int main() { %s x++; %s }' % ('do ' * n, 'while (x); ' * n),
+        'parens': 'int main() { x = %sa%s; }' % ('(' * n, ')' * n),
+        'unary': 'int main() { x = %sa; }' % ('-!' * (n // 2)),
+        'casts': 'int main() { x = %sa; }' % ('(int)' * n),
+        'ternary': 'int main() { x = %s 0; }' % ('a ? b : ' * n),
+        'assign': 'int main() { %s 0; }' % ('a = ' * n),
+        'calls': 'int main() { x = %s0%s; }' % ('f(' * n, ')' * n),
+        'binary': 'int main() { x = %s1%s; }' % (''.join('a %s (' % '+-*/'[i % 4] for i in range(n)), ')' * n),
+    }
+
+
+def depth(tree):
+    """ Length of the longest path from the root to a node """
+    best, stack = 0, [(tree, 1)]
+    while stack:
+        value, level = stack.pop()
+        if isinstance(value, Node):
+            best = max(best, level)
+            stack.extend((field, level + 1) for _, field in fields(value))
+        elif isinstance(value, list):
+            stack.extend((item, level) for item in value)
+    return best
+
+
+class TestStackParser(unittest.TestCase):
+
+    def test_same_tree_as_parser(self):
+        for name, code in programs(25).items():
+            with self.subTest(name):
+                self.assertEqual(
+                    shape(StackParser(RegexLexer(code)).parse()),
+                    shape(Parser(RegexLexer(code)).parse())
+                )
+
+    def test_deep_nesting(self):
+        for name, code in programs(DEPTH).items():
+            with self.subTest(name):
+                self.assertGreaterEqual(depth(StackParser(RegexLexer(code)).parse()), DEPTH)
+
+    def test_parser_recursion_limit(self):
+        for name, code in programs(DEPTH).items():
+            with self.subTest(name):
+                with self.assertRaises(RecursionError):
+                    Parser(RegexLexer(code)).parse()
+
+
+if __name__ == '__main__':
+    unittest.main()
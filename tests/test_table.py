@@ -0,0 +1,119 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+import unittest
+from interpreter.semantic_analysis.table import SymbolTable, Position, VarSymbol, BuiltinTypeSymbol
+from interpreter.syntax_analysis import tree
+from interpreter.syntax_analysis.arena import NODE_KINDS
+from helpers import samples
+from test_arena import analyzed
+
+
+def table():
+    symbols = SymbolTable()
+    symbols.enter('global')
+    symbols._init_builtins()
+    return symbols
+
+
+class TestSymbolTable(unittest.TestCase):
+
+    def test_exit_rolls_back(self):
+        symbols = table()
+        INT = symbols.lookup('int')
+        outer = VarSymbol('x', INT)
+        symbols.insert(outer)
+        log = list(symbols.log)
+
+        symbols.enter('f')
+        inner = VarSymbol('x', INT)
+        symbols.insert(inner)
+        symbols.insert(VarSymbol('y', INT))
+        symbols.enter()
+        symbols.insert(VarSymbol('z', INT))
+        self.assertIs(symbols.lookup('x'), inner)
+        self.assertIsNone(symbols.lookup('x', current_scope_only=True))
+        self.assertEqual(symbols.scope.scope_level, 3)
+        symbols.exit()
+        self.assertIsNone(symbols.lookup('z'))
+        symbols.exit()
+
+        self.assertIs(symbols.lookup('x'), outer)
+        self.assertIsNone(symbols.lookup('y'))
+        self.assertEqual(symbols.log, log)
+        self.assertEqual(symbols.scope.scope_level, 1)
+
+    def test_resolve_gives_the_declaring_scope(self):
+        symbols = table()
+        symbols.insert(VarSymbol('x', symbols.lookup('int')))
+        scope = symbols.scope
+        symbols.enter('f')
+        symbols.enter()
+        self.assertIs(symbols.resolve('x')[1], scope)
+        self.assertEqual(symbols.resolve('nothing'), (None, None))
+
+    def test_slots(self):
+        symbols = table()
+        symbols.enter('f')
+        a, b = VarSymbol('a', None), VarSymbol('b', None)
+        symbols.insert(a)
+        symbols.insert(b)
+        self.assertEqual((a.slot, b.slot), (0, 1))
+        # forgotten then declared again, a name keeps its slot
+        symbols.forget('a')
+        again = VarSymbol('a', None)
+        symbols.insert(again)
+        self.assertEqual(again.slot, 0)
+
+    def test_positions(self):
+        symbols = table()
+        first, second = Position(0), Position(1)
+        symbols.position = second
+        later = VarSymbol('g', None)
+        symbols.insert(later)
+        symbols.position = first
+        self.assertIsNone(symbols.lookup('g'))
+        # the builtins are seen from everywhere
+        self.assertIsInstance(symbols.lookup('int'), BuiltinTypeSymbol)
+        earlier = VarSymbol('g', None)
+        symbols.insert(earlier)
+        self.assertIs(symbols.lookup('g'), earlier)
+        symbols.position = second
+        self.assertIs(symbols.lookup('g'), later)
+        symbols.position = None
+        self.assertIs(symbols.lookup('g'), later)
+
+        symbols.position = first
+        self.assertIs(symbols.forget('g'), earlier)
+        symbols.position = second
+        self.assertIs(symbols.lookup('g'), later)
+
+    def test_history(self):
+        symbols = SymbolTable(history=True)
+        symbols.enter('global')
+        symbols.enter('f')
+        symbols.insert(VarSymbol('a', None))
+        symbols.exit()
+        self.assertIn('f (level 2)', str(symbols))
+        self.assertIn("a: <VarSymbol(name='a', type='None')>", str(symbols))
+
+
+class TestSlottedNodes(unittest.TestCase):
+
+    def test_node_classes(self):
+        for cls in NODE_KINDS + (tree.LazyBody,):
+            with self.subTest(cls.__name__):
+                self.assertIn('__slots__', vars(cls))
+
+    def test_nodes_have_no_dict(self):
+        stack = [analyzed(code) for code in samples().values()]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node)
+            elif isinstance(node, tree.Node):
+                self.assertFalse(hasattr(node, '__dict__'), type(node).__name__)
+                stack.extend(value for _, value in tree.fields(node))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+# -*- coding:utf8 -*-
+""" SCI - Simple C Interpreter """
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from io import StringIO
+import unittest
+from interpreter.lexical_analysis.lexer import RegexLexer
+from interpreter.syntax_analysis.parser import Parser
+from interpreter.semantic_analysis.analyzer import SemanticAnalyzer
+from helpers import samples, shape
+
+# the same struct name with other attributes, and a narrowing warning
+STRUCTS = '''
+struct point { %s };
+
+int main() {
+    int n;
+    n = %s;
+    return n;
+}
+'''
+
+
+def programs():
+    codes = samples()
+    codes['point_int'] = STRUCTS % ('int x; int y;', '1.5')
+    codes['point_char'] = STRUCTS % ('char x;', '2')
+    codes['point_double'] = STRUCTS % ('double x; double y; double z;', '2.5')
+    return codes
+
+
+def analysis(code):
+    """ Shape of the analyzed tree of code and the warnings of its analysis """
+    tree = Parser(RegexLexer(code)).parse()
+    analyzer = SemanticAnalyzer.analyze(tree)
+    return shape(tree), analyzer.warnings
+
+
+class TestThreads(unittest.TestCase):
+
+    def test_concurrent_analyses(self):
+        codes = programs()
+        names = sorted(codes) * 8
+        with redirect_stdout(StringIO()):
+            serial = {name: analysis(codes[name]) for name in codes}
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(lambda name: analysis(codes[name]), names))
+        self.assertTrue(serial['point_int'][1])
+        for name, result in zip(names, results):
+            with self.subTest(name):
+                self.assertEqual(result, serial[name])
+
+
+if __name__ == '__main__':
+    unittest.main()